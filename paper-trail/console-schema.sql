@@ -60,6 +60,27 @@ CREATE TABLE IF NOT EXISTS tasks (
     metadata JSONB -- Additional context, files changed, etc.
 );
 
+-- Task claiming: workers lease pending tasks (see POST /api/tasks/claim)
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS priority_rank SMALLINT GENERATED ALWAYS AS (
+    CASE priority WHEN 'urgent' THEN 0 WHEN 'high' THEN 1 WHEN 'low' THEN 3 ELSE 2 END
+) STORED;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP;
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS attempts INT DEFAULT 0;
+
+-- Wake waiting workers when a task becomes claimable (one notification per transaction)
+CREATE OR REPLACE FUNCTION notify_task_pending() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('tasks_pending', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS tasks_pending_notify ON tasks;
+CREATE TRIGGER tasks_pending_notify
+    AFTER INSERT OR UPDATE OF status ON tasks
+    FOR EACH ROW WHEN (NEW.status = 'pending')
+    EXECUTE FUNCTION notify_task_pending();
+
 -- Task Activity Log
 CREATE TABLE IF NOT EXISTS task_activity (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -109,8 +130,11 @@ CREATE INDEX idx_projects_user ON projects(user_id);
 CREATE INDEX idx_tasks_project ON tasks(project_id);
 CREATE INDEX idx_tasks_status ON tasks(status);
 CREATE INDEX idx_tasks_assigned_llm ON tasks(assigned_llm);
+CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, priority_rank, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks(lease_expires_at) WHERE status = 'in_progress';
 CREATE INDEX idx_contributions_user ON contributions(user_id);
 CREATE INDEX idx_notifications_user ON notifications(user_id, is_read);
+CREATE INDEX IF NOT EXISTS idx_notifications_recent ON notifications(user_id, created_at DESC);
 
 -- Initial data: Shivam's account
 INSERT INTO users (username, email, github_username) VALUES
@@ -0,0 +1,6 @@
+#!/bin/sh
+# Runs once on a fresh postgres volume, after schema.sql: the console database
+# (tasks, projects, notifications) lives beside paper_trail as "antimony"
+set -e
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname "$POSTGRES_DB" -c "CREATE DATABASE antimony OWNER $POSTGRES_USER"
+psql -v ON_ERROR_STOP=1 --username "$POSTGRES_USER" --dbname antimony -f /console/console-schema.sql
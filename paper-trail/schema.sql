@@ -83,6 +83,16 @@ CREATE TABLE contribution_relationships (
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+-- Contribution Closure - Every ancestor/descendant pair with its shortest distance,
+-- over all relationships ('*') and per relationship type; maintained by the API
+CREATE TABLE contribution_closure (
+    ancestor_id UUID NOT NULL REFERENCES contributions(id) ON DELETE CASCADE,
+    descendant_id UUID NOT NULL REFERENCES contributions(id) ON DELETE CASCADE,
+    relationship_type VARCHAR(50) NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, relationship_type, descendant_id)
+);
+
 -- LLM Sessions - Track LLM interactions
 CREATE TABLE llm_sessions (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -90,12 +100,26 @@ CREATE TABLE llm_sessions (
     user_id UUID REFERENCES users(id),
     idea_id UUID REFERENCES ideas(id),
     llm_instances JSONB, -- Which LLMs are involved: [claude-rpi5, codex-hpc, etc.]
-    conversation_history JSONB,
+    conversation_history JSONB, -- Legacy; turns now live in llm_session_turns
+    turn_count BIGINT NOT NULL DEFAULT 0, -- Last turn seq handed out
+    compacted_through BIGINT NOT NULL DEFAULT 0, -- Turns up to this seq are folded into snapshot
+    snapshot JSONB, -- Summary of compacted turns
     created_at TIMESTAMP DEFAULT NOW(),
     updated_at TIMESTAMP DEFAULT NOW(),
     is_active BOOLEAN DEFAULT true
 );
 
+-- LLM Session Turns - Append-only conversation log, one row per turn
+CREATE TABLE llm_session_turns (
+    session_id UUID NOT NULL REFERENCES llm_sessions(id) ON DELETE CASCADE,
+    seq BIGINT NOT NULL,
+    role VARCHAR(50), -- user, assistant, system, tool
+    llm_name VARCHAR(50),
+    content JSONB,
+    created_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (session_id, seq)
+);
+
 -- Paper-Trail Brain - Learned patterns and knowledge
 CREATE TABLE brain_learnings (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -114,6 +138,8 @@ CREATE TABLE crypto_ledger (
     entity_type VARCHAR(50), -- idea, contribution, nft, etc.
     entity_id UUID NOT NULL,
     action VARCHAR(50), -- created, modified, minted, transferred
+    seq BIGINT UNIQUE, -- Position in the hash chain (1-based)
+    block_number BIGINT, -- Sealed block, NULL until the block fills
     merkle_root VARCHAR(255),
     previous_hash VARCHAR(255),
     current_hash VARCHAR(255) NOT NULL,
@@ -122,20 +148,45 @@ CREATE TABLE crypto_ledger (
     metadata JSONB DEFAULT '{}'::jsonb
 );
 
+-- Ledger Blocks - Merkle root over each run of LEDGER_BLOCK_SIZE ledger entries
+CREATE TABLE ledger_blocks (
+    block_number BIGINT PRIMARY KEY,
+    first_seq BIGINT NOT NULL,
+    last_seq BIGINT NOT NULL,
+    merkle_root VARCHAR(64) NOT NULL,
+    last_hash VARCHAR(64) NOT NULL, -- Chain hash of the block's last entry
+    sealed_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Paper-Trail Events - Durable copy of the Redis trail cache (written behind by the API)
+CREATE TABLE paper_trail_events (
+    id BIGSERIAL PRIMARY KEY,
+    event_id VARCHAR(64) UNIQUE NOT NULL, -- Outbox stream entry ID, makes retried flushes idempotent
+    entity_type VARCHAR(50) NOT NULL,
+    entity_id VARCHAR(255) NOT NULL,
+    action VARCHAR(100) NOT NULL,
+    data JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
 -- Indexes for performance
 CREATE INDEX idx_ideas_user ON ideas(user_id);
 CREATE INDEX idx_ideas_status ON ideas(status);
 CREATE INDEX idx_ideas_created ON ideas(created_at DESC);
-CREATE INDEX idx_prds_idea ON prds(idea_id);
+CREATE INDEX idx_prds_idea ON prds(idea_id, version DESC);
 CREATE INDEX idx_nft_idea ON nft_tokens(idea_id);
 CREATE INDEX idx_nft_owner ON nft_tokens(owner_id);
 CREATE INDEX idx_contributions_idea ON contributions(idea_id);
 CREATE INDEX idx_contributions_user ON contributions(user_id);
 CREATE INDEX idx_contributions_type ON contributions(contribution_type);
+CREATE INDEX idx_contribution_rel_parent ON contribution_relationships(parent_contribution_id, relationship_type);
+CREATE INDEX idx_contribution_rel_child ON contribution_relationships(child_contribution_id, relationship_type);
+CREATE INDEX idx_contribution_closure_descendant ON contribution_closure(descendant_id, relationship_type, depth);
 CREATE INDEX idx_llm_sessions_user ON llm_sessions(user_id);
 CREATE INDEX idx_llm_sessions_active ON llm_sessions(is_active);
-CREATE INDEX idx_crypto_ledger_entity ON crypto_ledger(entity_type, entity_id);
+CREATE INDEX idx_crypto_ledger_entity ON crypto_ledger(entity_type, entity_id, seq DESC);
 CREATE INDEX idx_brain_pattern_type ON brain_learnings(pattern_type);
+CREATE INDEX idx_trail_events_entity ON paper_trail_events(entity_type, entity_id, id DESC);
 
 -- Create Gitea database for Gitea service
 CREATE DATABASE gitea;
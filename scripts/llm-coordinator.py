@@ -5,14 +5,42 @@ This script runs on both RPi5 and HPC to enable inter-LLM communication
 """
 
 import asyncio
+import fcntl
+import hashlib
 import json
+import os
+import random
+import shlex
+import shutil
+import socket
 import sys
+import time
 import subprocess
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Callable, List, Optional
+from urllib.parse import urlencode
+import httpx
 import redis.asyncio as redis
 import websockets
 
+# Fast JSON when orjson is installed; MessagePack frames when msgpack is
+try:
+    import orjson
+
+    def json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    json_loads = orjson.loads
+except ImportError:
+    json_dumps, json_loads = json.dumps, json.loads
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 # Configuration
 INSTANCE_NAME = sys.argv[1] if len(sys.argv) > 1 else "claude-rpi5"
 
@@ -26,15 +54,607 @@ else:
     REDIS_URL = "redis://localhost:6379"
     API_URL = "ws://localhost:8000"
 
+# HTTP side of the same API
+API_HTTP_URL = API_URL.replace("ws://", "http://", 1).replace("wss://", "https://", 1)
+
+# Pooled HTTP client for coordinator → API calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("COORDINATOR_HTTP_MAX_CONNECTIONS", "10"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("COORDINATOR_HTTP_MAX_KEEPALIVE", "5"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("COORDINATOR_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("COORDINATOR_HTTP_TIMEOUT", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("COORDINATOR_HTTP_CONNECT_TIMEOUT", "5"))
+HTTP2 = os.getenv("COORDINATOR_HTTP2", "0") == "1"  # Needs the h2 package (httpx[http2])
+
+# Heartbeats ride the task WebSocket when one is open, otherwise they are POSTed
+HEARTBEAT_INTERVAL = float(os.getenv("COORDINATOR_HEARTBEAT_SECONDS", "10"))
+
+# Task WebSocket: ask the API to coalesce messages within WS_BATCH_MS into one frame (0 = off),
+# and negotiate permessage-deflate unless WS_COMPRESSION is "none"
+WS_BATCH_MS = int(os.getenv("COORDINATOR_WS_BATCH_MS", "0"))
+WS_COMPRESSION = os.getenv("COORDINATOR_WS_COMPRESSION", "deflate")
+WS_CODEC = os.getenv("COORDINATOR_WS_CODEC", "json")  # json or msgpack (binary frames)
+
+# Reconnect backoff: exponential from RECONNECT_BASE up to RECONNECT_MAX seconds, with full jitter
+RECONNECT_BASE = float(os.getenv("COORDINATOR_RECONNECT_BASE_SECONDS", "0.5"))
+RECONNECT_MAX = float(os.getenv("COORDINATOR_RECONNECT_MAX_SECONDS", "30"))
+
+# Results are sent in batches: up to RESULT_BATCH_SIZE per request, lingering RESULT_BATCH_MS
+RESULT_BATCH_SIZE = int(os.getenv("COORDINATOR_RESULT_BATCH_SIZE", "32"))
+RESULT_BATCH_MS = int(os.getenv("COORDINATOR_RESULT_BATCH_MS", "50"))
+# Results held while the API is unreachable; the oldest are dropped past this
+RESULT_BUFFER_MAX = int(os.getenv("COORDINATOR_RESULT_BUFFER_MAX", "10000"))
+
+# Task delivery: "pubsub" reads the WebSocket, "streams" reads Redis Streams
+DELIVERY_MODE = os.getenv("LLM_DELIVERY_MODE", "pubsub")
+STREAM_LANES = ("high", "normal", "low")  # Drained in this order
+STREAM_BATCH_SIZE = int(os.getenv("LLM_STREAM_BATCH_SIZE", "16"))
+STREAM_BLOCK_MS = int(os.getenv("LLM_STREAM_BLOCK_MS", "5000"))
+STREAM_PENDING_TIMEOUT_MS = int(os.getenv("LLM_STREAM_PENDING_TIMEOUT_MS", "300000"))
+# Entries that failed this many deliveries are acked and dropped instead of retried again
+STREAM_MAX_DELIVERIES = int(os.getenv("LLM_STREAM_MAX_DELIVERIES", "5"))
+
+# Task execution: concurrent workers fed by a bounded queue
+TASK_WORKERS = int(os.getenv("COORDINATOR_TASK_WORKERS", "4"))
+TASK_QUEUE_SIZE = int(os.getenv("COORDINATOR_TASK_QUEUE_SIZE", "256"))
+# Per-task-type concurrency caps, e.g. "generate_code_structure=1,process_new_idea=2"
+TASK_TYPE_LIMITS = {
+    name.strip(): int(limit)
+    for name, limit in (
+        item.split("=") for item in os.getenv("COORDINATOR_TASK_LIMITS", "").split(",") if item
+    )
+}
+# Relative host capacity reported to the router; defaults to the core count
+HOST_CAPACITY = float(os.getenv("COORDINATOR_HOST_CAPACITY", str(os.cpu_count() or 1)))
+# Process pool size for CPU-bound local work (0 runs it in a thread instead)
+PROCESS_WORKERS = int(os.getenv("COORDINATOR_PROCESS_WORKERS", "0"))
+
+# CPU-bound task handlers, run outside the event loop.
+# Handlers must be module-level functions taking (context) so they can be pickled.
+CPU_BOUND_TASKS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+
+# Task result cache shared by every instance through Redis, keyed by (kind, task, context)
+TASK_CACHE_ENABLED = os.getenv("COORDINATOR_TASK_CACHE", "1") == "1"
+TASK_CACHE_TTL = int(os.getenv("COORDINATOR_TASK_CACHE_TTL_SECONDS", "86400"))
+TASK_CACHE_MAX_ENTRIES = int(os.getenv("COORDINATOR_TASK_CACHE_MAX_ENTRIES", "10000"))
+# Single-flight lock: how long one execution may hold it, and how often waiters poll
+TASK_LOCK_TTL_MS = int(os.getenv("COORDINATOR_TASK_LOCK_TTL_MS", "600000"))
+TASK_LOCK_POLL_MS = int(os.getenv("COORDINATOR_TASK_LOCK_POLL_MS", "200"))
+
+TASK_CACHE_INDEX = "taskcache:index"
+
+# Store a result, drop index members whose entry has expired (scored - last store or
+# hit - before the TTL window), then evict the least recently used entries beyond the cap
+CACHE_STORE_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], KEYS[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. (tonumber(ARGV[3]) - tonumber(ARGV[2])))
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if excess > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+    redis.call('DEL', unpack(evicted))
+end
+"""
+
+# Release the single-flight lock only if we still own it
+LOCK_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class TaskResultCache:
+    """
+    Content-addressed cache of task results with cross-instance single-flight
+    Identical (kind, task, context) requests run once: the first instance takes a
+    Redis lock and executes, the rest wait for its cached result.
+    """
+
+    def __init__(self, redis_client, ttl: int = TASK_CACHE_TTL, max_entries: int = TASK_CACHE_MAX_ENTRIES):
+        self.redis_client = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store_script = redis_client.register_script(CACHE_STORE_SCRIPT)
+        self.release_script = redis_client.register_script(LOCK_RELEASE_SCRIPT)
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.token = f"{socket.gethostname()}-{os.getpid()}"
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.tokens_saved = 0
+
+    @staticmethod
+    def key(kind: str, task: str, context: Dict[str, Any]) -> str:
+        canonical = json.dumps(context, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        return f"taskcache:{kind}:{task}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+    @staticmethod
+    def estimate_tokens(context: Dict[str, Any], result: Dict[str, Any]) -> int:
+        """Reported usage when the result has it, else ~4 characters per token of prompt + output"""
+        usage = result.get("usage") or {}
+        if usage.get("total_tokens"):
+            return int(usage["total_tokens"])
+        return (len(json.dumps(context, default=str)) + len(json.dumps(result, default=str))) // 4
+
+    async def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = await self.redis_client.get(key)
+        if cached is None:
+            return None
+        entry = json_loads(cached)
+        await self.redis_client.zadd(TASK_CACHE_INDEX, {key: time.time()})
+        self.hits += 1
+        self.tokens_saved += entry.get("tokens", 0)
+        return entry["result"]
+
+    async def get_or_run(self, kind: str, task: str, context: Dict[str, Any],
+                         run: Callable[[], Any]) -> Dict[str, Any]:
+        """Cached result for the task, executing `run` at most once across instances"""
+        key = self.key(kind, task, context)
+
+        # Same task already running in this process
+        if key in self.inflight:
+            self.waits += 1
+            result = await asyncio.shield(self.inflight[key])
+            self.hits += 1
+            self.tokens_saved += self.estimate_tokens(context, result)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            result = await self._get_or_run(key, context, run)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Marked retrieved; local waiters still see it
+            raise
+        finally:
+            del self.inflight[key]
+
+    async def _get_or_run(self, key: str, context: Dict[str, Any], run) -> Dict[str, Any]:
+        lock_key = f"{key}:lock"
+        deadline = time.monotonic() + TASK_LOCK_TTL_MS / 1000
+        waited = False
+        while True:
+            result = await self._lookup(key)
+            if result is not None:
+                return result
+
+            if await self.redis_client.set(lock_key, self.token, nx=True, px=TASK_LOCK_TTL_MS):
+                break
+
+            # Another instance is executing it; wait for its result (or for its lock to go away)
+            if not waited:
+                self.waits += 1
+                waited = True
+            if time.monotonic() > deadline:
+                break
+            await asyncio.sleep(TASK_LOCK_POLL_MS / 1000)
+
+        self.misses += 1
+        try:
+            result = await run()
+            # Errors and placeholders (no CLI on the executing host) must not be served to others
+            if not result.get("error") and not result.get("placeholder"):
+                entry = json_dumps({"result": result, "tokens": self.estimate_tokens(context, result)})
+                await self.store_script(
+                    keys=[key, TASK_CACHE_INDEX], args=[entry, self.ttl, time.time(), self.max_entries]
+                )
+            return result
+        finally:
+            await self.release_script(keys=[lock_key], args=[self.token])
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "waits": self.waits,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "tokens_saved": self.tokens_saved
+        }
+
+
+# Pre-started CLI workers speaking NDJSON on stdin/stdout, one pool per LLM kind.
+# The default Claude command reads stream-json user messages and ends each turn with a
+# {"type": "result"} line; a Codex command must speak the same framing (empty = no pool).
+# stream-json input is one conversation, so by default a worker answers a single task and
+# is replaced: tasks never see each other's prompts and cached results depend only on
+# their key. Raise COORDINATOR_CLI_MAX_TASKS only for commands that keep no history.
+CLI_COMMANDS = {
+    "claude": os.getenv(
+        "COORDINATOR_CLAUDE_CMD", "claude -p --input-format stream-json --output-format stream-json --verbose"
+    ),
+    "codex": os.getenv("COORDINATOR_CODEX_CMD", "")
+}
+CLI_POOL_SIZE = int(os.getenv("COORDINATOR_CLI_POOL_SIZE", "2"))  # Pre-warmed workers per coordinator
+CLI_MAX_TASKS = int(os.getenv("COORDINATOR_CLI_MAX_TASKS", "1"))  # Recycle a worker after this many tasks
+CLI_MAX_RSS_MB = int(os.getenv("COORDINATOR_CLI_MAX_RSS_MB", "1024"))  # ...or once it grows past this
+CLI_TASK_TIMEOUT = float(os.getenv("COORDINATOR_CLI_TASK_TIMEOUT_SECONDS", "300"))
+# Host-wide cap on concurrently running CLI tasks, shared by every coordinator through lock files
+CLI_HOST_SLOTS = int(os.getenv("COORDINATOR_CLI_HOST_SLOTS", str(max((os.cpu_count() or 1) // 2, 1))))
+CLI_SLOT_DIR = os.getenv("COORDINATOR_CLI_SLOT_DIR", "/tmp/llm-coordinator-slots")
+CLI_LINE_LIMIT = 16 * 1024 * 1024  # Longest single NDJSON line accepted from a worker
+
+
+class CLIWorkerError(RuntimeError):
+    """A CLI worker died or answered with something unreadable"""
+
+
+class CLIWorkerTimeout(CLIWorkerError):
+    """A CLI worker took longer than the task timeout and was killed"""
+
+
+class HostSlots:
+    """
+    Counting semaphore across every process on the host, built from flock'd slot files
+    A crashed holder releases its slot automatically when the kernel closes its file.
+    """
+
+    def __init__(self, slots: int = CLI_HOST_SLOTS, directory: str = CLI_SLOT_DIR):
+        self.paths = [os.path.join(directory, f"slot-{i}.lock") for i in range(slots)]
+        os.makedirs(directory, exist_ok=True)
+
+    def _try_acquire(self) -> Optional[int]:
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        return None
+
+    async def acquire(self) -> int:
+        delay = 0.05
+        while (fd := self._try_acquire()) is None:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        return fd
+
+    @staticmethod
+    def release(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class CLIWorker:
+    """One CLI process started ahead of time; one request line in, NDJSON lines out until a result line"""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.process = None
+        self.tasks_done = 0
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *shlex.split(self.command),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=CLI_LINE_LIMIT
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def rss_mb(self) -> float:
+        """Resident set size from /proc (0 where /proc is unavailable)"""
+        try:
+            with open(f"/proc/{self.process.pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return 0.0
+
+    async def request(self, payload: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Send one request and return the result line; kills the worker on timeout"""
+        try:
+            return await asyncio.wait_for(self._exchange(payload), timeout)
+        except asyncio.TimeoutError:
+            await self.kill()
+            raise CLIWorkerTimeout(f"CLI worker timed out after {timeout}s")
+        except (BrokenPipeError, ConnectionResetError, ValueError) as e:
+            await self.kill()
+            raise CLIWorkerError(f"CLI worker failed: {e}")
+
+    async def _exchange(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        self.process.stdin.write(json_dumps(payload).encode() + b"\n")
+        await self.process.stdin.drain()
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                raise CLIWorkerError(f"CLI worker exited with code {await self.process.wait()}")
+            line = line.strip()
+            if not line:
+                continue
+            message = json_loads(line)
+            if message.get("type") == "result":
+                self.tasks_done += 1
+                return message
+
+    async def kill(self):
+        if self.alive:
+            self.process.kill()
+        if self.process is not None:
+            await self.process.wait()
+
+    async def stop(self):
+        """Close stdin so the CLI exits on its own, killing it if it lingers"""
+        if not self.alive:
+            return
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 5)
+        except asyncio.TimeoutError:
+            await self.kill()
+
+
+class CLIWorkerPool:
+    """
+    Pre-warmed pool of CLI workers so process startup happens off the request path
+    Workers are recycled after `max_tasks` tasks (by default one, so every task starts a
+    fresh conversation) or `max_rss_mb` of RSS; concurrency is bounded by the pool size
+    and by the host-wide slots.
+    """
+
+    def __init__(self, kind: str, command: str, size: int = CLI_POOL_SIZE, max_tasks: int = CLI_MAX_TASKS,
+                 max_rss_mb: int = CLI_MAX_RSS_MB, timeout: float = CLI_TASK_TIMEOUT,
+                 host_slots: Optional[HostSlots] = None):
+        self.kind = kind
+        self.command = command
+        self.size = size
+        self.max_tasks = max_tasks
+        self.max_rss_mb = max_rss_mb
+        self.timeout = timeout
+        self.host_slots = host_slots or HostSlots()
+        self.idle = asyncio.Queue()
+        self.workers = set()
+        # Background respawns of recycled workers, cancelled on close
+        self.replacements = set()
+        self.closed = False
+
+        # Counters
+        self.tasks = 0
+        self.spawned = 0
+        self.recycled = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    async def _spawn(self) -> CLIWorker:
+        worker = CLIWorker(self.command)
+        await worker.start()
+        self.workers.add(worker)
+        self.spawned += 1
+        return worker
+
+    async def start(self):
+        """Pre-warm the pool"""
+        for _ in range(self.size):
+            self.idle.put_nowait(await self._spawn())
+        print(f"🔥 {self.size} {self.kind} CLI workers warm")
+
+    async def _retire(self, worker: CLIWorker):
+        # Still tracked while stopping, so close() stops it if this is cancelled midway
+        await worker.stop()
+        self.workers.discard(worker)
+
+    async def run(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one request on an idle worker"""
+        worker = await self.idle.get()
+        slot = await self.host_slots.acquire()
+        try:
+            if not worker.alive:
+                self.workers.discard(worker)
+                worker = await self._spawn()
+            result = await worker.request(payload, self.timeout)
+            self.tasks += 1
+            return result
+        except CLIWorkerTimeout:
+            self.timeouts += 1
+            raise
+        except CLIWorkerError:
+            self.failures += 1
+            raise
+        finally:
+            self.host_slots.release(slot)
+            if worker.alive and worker.tasks_done < self.max_tasks and worker.rss_mb() < self.max_rss_mb:
+                self.idle.put_nowait(worker)
+            else:
+                # Replace it off the request path so the next task still finds a warm worker
+                if worker.alive:
+                    self.recycled += 1
+                replacement = asyncio.create_task(self._replace(worker))
+                self.replacements.add(replacement)
+                replacement.add_done_callback(self.replacements.discard)
+
+    async def _replace(self, worker: CLIWorker):
+        await self._retire(worker)
+        delay = 1.0
+        while not self.closed:
+            try:
+                self.idle.put_nowait(await self._spawn())
+                return
+            except OSError as e:
+                print(f"⚠️  Could not respawn {self.kind} CLI worker: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self.workers),
+            "idle": self.idle.qsize(),
+            "tasks": self.tasks,
+            "spawned": self.spawned,
+            "recycled": self.recycled,
+            "timeouts": self.timeouts,
+            "failures": self.failures
+        }
+
+    async def close(self):
+        self.closed = True
+        for replacement in list(self.replacements):
+            replacement.cancel()
+        await asyncio.gather(*self.replacements, return_exceptions=True)
+        while not self.idle.empty():
+            self.idle.get_nowait()
+        await asyncio.gather(*(self._retire(worker) for worker in list(self.workers)))
+
+
+class TaskExecutor:
+    """
+    Runs tasks on N concurrent workers fed by a bounded asyncio queue
+    Task types over their concurrency cap are parked rather than blocking a worker;
+    parked tasks still count against queue_size, so submit() applies backpressure
+    """
+
+    def __init__(self, handler, workers: int = TASK_WORKERS, queue_size: int = TASK_QUEUE_SIZE,
+                 type_limits: Optional[Dict[str, int]] = None, process_workers: int = PROCESS_WORKERS):
+        self.handler = handler
+        self.worker_count = workers
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        # One slot per task waiting to run, queued or parked; freed when it starts
+        self.waiting_slots = asyncio.Semaphore(queue_size)
+        self.type_limits = type_limits if type_limits is not None else TASK_TYPE_LIMITS
+        self.running_by_type = defaultdict(int)
+        self.parked = defaultdict(deque)
+        self.process_pool = ProcessPoolExecutor(max_workers=process_workers) if process_workers > 0 else None
+        self.workers = []
+
+        # Counters
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    def start(self):
+        """Start the worker tasks"""
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def submit(self, task_data: Dict[str, Any], on_done: Optional[Callable] = None):
+        """Queue a task; waits while queue_size tasks are waiting. on_done(succeeded) runs when it finishes"""
+        await self.waiting_slots.acquire()
+        await self.queue.put((task_data, on_done))
+
+    async def run_cpu_bound(self, func: Callable, *args):
+        """Run CPU-heavy work in the process pool (or a thread when no pool is configured)"""
+        if self.process_pool is None:
+            return await asyncio.to_thread(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.process_pool, func, *args)
+
+    async def _worker(self):
+        while True:
+            item = await self.queue.get()
+            task_type = item[0].get("task")
+
+            limit = self.type_limits.get(task_type)
+            if limit is not None and self.running_by_type[task_type] >= limit:
+                # The worker running this type picks it up when a slot frees
+                self.parked[task_type].append(item)
+                continue
+
+            while item is not None:
+                await self._run(task_type, item)
+                item = self.parked[task_type].popleft() if self.parked[task_type] else None
+
+    async def _run(self, task_type: str, item):
+        task_data, on_done = item
+        self.waiting_slots.release()
+        self.running_by_type[task_type] += 1
+        self.in_flight += 1
+        succeeded = False
+        try:
+            await self.handler(task_data)
+            self.completed += 1
+            succeeded = True
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Task {task_type} failed: {e}")
+        finally:
+            self.in_flight -= 1
+            self.running_by_type[task_type] -= 1
+            if on_done:
+                on_done(succeeded)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and in-flight counters"""
+        return {
+            "queue_depth": self.queue.qsize() + sum(len(items) for items in self.parked.values()),
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "workers": self.worker_count,
+            "running_by_type": {name: count for name, count in self.running_by_type.items() if count}
+        }
+
+    async def close(self):
+        """Stop the workers and the process pool"""
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def decode_frame(message) -> List[Dict[str, Any]]:
+    """
+    Messages carried by one WebSocket frame: binary frames are MessagePack, text frames
+    JSON, and batch frames carry several. Raises ValueError for a malformed frame.
+    """
+    try:
+        if isinstance(message, bytes):
+            if msgpack is None:
+                raise ValueError("binary frame but msgpack is not installed")
+            data = msgpack.unpackb(message, raw=False)
+        else:
+            data = json_loads(message)
+    except (TypeError, ValueError) as e:  # msgpack's decode errors subclass ValueError
+        raise ValueError(f"undecodable frame: {e}") from e
+
+    items = data.get("messages") if isinstance(data, dict) and data.get("type") == "batch" else [data]
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError("frame is not a message or a batch of messages")
+    return items
+
 
 class LLMCoordinator:
     """Coordinates communication between Claude Code and Codex"""
 
     def __init__(self, instance_name: str):
         self.instance_name = instance_name
+        self.kind = "claude" if "claude" in instance_name else "codex" if "codex" in instance_name else "unknown"
         self.redis_client = None
         self.websocket = None
         self.running = True
+        self.executor = TaskExecutor(self.process_task)
+        self.result_cache = None
+        self.cli_pool = None
+        self.http_client = None
+        self.result_buffer = []
+        self.results_ready = asyncio.Event()
+        self.results_dropped = 0
+
+        # Streams: one consumer group per instance across its own and the coordination streams
+        self.stream_group = instance_name
+        self.stream_consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.task_streams = [
+            f"stream:llm:{channel}:{lane}"
+            for lane in STREAM_LANES
+            for channel in (instance_name, "coordination")
+        ]
+        self.pending_acks = defaultdict(list)
+        # Entries read by this process and not yet finished: queued or running
+        self.stream_inflight = set()
+
+        # Highest pub/sub sequence number seen; sent back on reconnect to replay the gap
+        self.last_seq = None
 
     async def connect(self):
         """Connect to Redis and API WebSocket"""
@@ -42,25 +662,99 @@ class LLMCoordinator:
 
         # Connect to Redis
         self.redis_client = await redis.from_url(REDIS_URL, decode_responses=True)
+        if TASK_CACHE_ENABLED:
+            self.result_cache = TaskResultCache(self.redis_client)
+
+        # Warm the CLI workers now so the first task doesn't pay their startup
+        command = CLI_COMMANDS.get(self.kind)
+        if command and shutil.which(shlex.split(command)[0]):
+            self.cli_pool = CLIWorkerPool(self.kind, command)
+            await self.cli_pool.start()
+        elif command:
+            print(f"⚠️  {shlex.split(command)[0]} not found, {self.kind} tasks use placeholder results")
+
+        # One long-lived HTTP client for every API call
+        self.http_client = self.create_http_client()
 
-        # Connect to WebSocket
-        self.websocket = await websockets.connect(f"{API_URL}/ws/llm/{self.instance_name}")
+        if DELIVERY_MODE == "streams":
+            await self.ensure_stream_groups()
 
         print(f"✅ {self.instance_name} connected successfully")
 
+    async def connect_websocket(self):
+        """Open the task WebSocket, asking for a replay of anything missed since last_seq"""
+        params = {}
+        if WS_BATCH_MS:
+            params["batch_ms"] = WS_BATCH_MS
+        if WS_CODEC == "msgpack":
+            if msgpack is None:
+                print("⚠️  MessagePack requested but msgpack is not installed, using JSON")
+            else:
+                params["codec"] = "msgpack"
+        if self.last_seq is not None:
+            params["since_seq"] = self.last_seq
+        url = f"{API_URL}/ws/llm/{self.instance_name}"
+        if params:
+            url += f"?{urlencode(params)}"
+        self.websocket = await websockets.connect(
+            url, compression=None if WS_COMPRESSION == "none" else WS_COMPRESSION
+        )
+
+    def create_http_client(self) -> httpx.AsyncClient:
+        """Keep-alive client pool shared by heartbeats, results and delegation"""
+        http2 = HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("⚠️  HTTP/2 requested but h2 is not installed, using HTTP/1.1")
+                http2 = False
+
+        return httpx.AsyncClient(
+            base_url=API_HTTP_URL,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+
+    def heartbeat_meta(self) -> Dict[str, Any]:
+        """Presence metadata: where this instance runs, what it can do and how busy it is"""
+        meta = {
+            "host": socket.gethostname(),
+            "kind": self.kind,
+            "capabilities": [self.kind] + list(CPU_BOUND_TASKS),
+            "capacity": HOST_CAPACITY,
+            "load": {
+                **self.executor.stats(),
+                "cpu": round(os.getloadavg()[0] / (os.cpu_count() or 1), 3)
+            }
+        }
+        if self.result_cache:
+            meta["task_cache"] = self.result_cache.stats()
+        if self.cli_pool:
+            meta["cli_pool"] = self.cli_pool.stats()
+        meta["results"] = {"buffered": len(self.result_buffer), "dropped": self.results_dropped}
+        return meta
+
     async def send_heartbeat(self):
-        """Send periodic heartbeat to API"""
-        import httpx
-        async with httpx.AsyncClient() as client:
-            while self.running:
-                try:
-                    await client.post(
-                        f"http://localhost:8000/api/system/llm/heartbeat/{self.instance_name}"
+        """Send periodic heartbeat (with host, capabilities and load) to API"""
+        while self.running:
+            try:
+                if self.websocket is not None:
+                    await self.websocket.send(json_dumps({"type": "heartbeat", **self.heartbeat_meta()}))
+                else:
+                    await self.http_client.post(
+                        f"/api/system/llm/heartbeat/{self.instance_name}",
+                        json=self.heartbeat_meta()
                     )
-                    await asyncio.sleep(30)  # Every 30 seconds
-                except Exception as e:
-                    print(f"⚠️  Heartbeat failed: {e}")
-                    await asyncio.sleep(5)
+                await asyncio.sleep(HEARTBEAT_INTERVAL)
+            except Exception as e:
+                print(f"⚠️  Heartbeat failed: {e}")
+                await asyncio.sleep(5)
 
     async def listen_for_tasks(self):
         """Listen for tasks from other LLMs"""
@@ -68,36 +762,234 @@ class LLMCoordinator:
 
         try:
             async for message in self.websocket:
-                data = json.loads(message)
-                print(f"\n📨 Received task: {data.get('task')}")
-                print(f"   From: {data.get('from')}")
-                print(f"   Session: {data.get('session_id')}")
+                # One bad frame is skipped; it must not take the listener down
+                try:
+                    items = decode_frame(message)
+                except ValueError as e:
+                    print(f"⚠️  Skipping malformed frame ({len(message)} bytes): {e}")
+                    continue
 
-                # Process the task
-                await self.process_task(data)
+                for item in items:
+                    await self.handle_ws_message(item)
 
         except websockets.exceptions.ConnectionClosed:
             print(f"🔌 Connection closed for {self.instance_name}")
 
+    async def listen_with_reconnect(self):
+        """Keep the task WebSocket up, reconnecting with jittered exponential backoff"""
+        attempt = 0
+        while self.running:
+            try:
+                await self.connect_websocket()
+                attempt = 0
+                await self.listen_for_tasks()
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+                print(f"⚠️  WebSocket connect failed: {e}")
+            self.websocket = None
+            if not self.running:
+                break
+
+            delay = random.uniform(0, min(RECONNECT_MAX, RECONNECT_BASE * 2 ** attempt))
+            attempt += 1
+            print(f"🔁 Reconnecting {self.instance_name} in {delay:.1f}s (since seq {self.last_seq})")
+            await asyncio.sleep(delay)
+
+    async def handle_ws_message(self, data: Dict[str, Any]):
+        """Answer control frames, hand tasks to the executor"""
+        if data.get("type") == "ping":
+            await self.websocket.send(json_dumps({"type": "pong"}))
+            return
+        if data.get("type") == "pong":
+            return
+        if data.get("type") == "replay":
+            print(f"⏪ Replaying {data['count']} message(s) since seq {data['since_seq']}")
+            if data.get("truncated"):
+                print("⚠️  Replay buffer was trimmed; some messages in the gap may be missing")
+            return
+
+        seq = data.get("_seq")
+        if seq is not None:
+            self.last_seq = seq if self.last_seq is None else max(self.last_seq, seq)
+
+        print(f"\n📨 Received task: {data.get('task')}")
+        print(f"   From: {data.get('from')}")
+        print(f"   Session: {data.get('session_id')}")
+
+        # Hand off to the worker pool so reading continues while tasks run
+        await self.executor.submit(data)
+
+    async def ensure_stream_groups(self):
+        """Create this instance's consumer group on every task stream"""
+        for stream in self.task_streams:
+            try:
+                await self.redis_client.xgroup_create(stream, self.stream_group, id="$", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def listen_for_stream_tasks(self):
+        """Consume tasks from Redis Streams in priority order with explicit acks"""
+        print(f"👂 {self.instance_name} consuming task streams...")
+
+        last_claim = last_touch = 0.0
+        while self.running:
+            try:
+                await self.flush_stream_acks()
+                entries = []
+
+                # Keep entries that are still queued or running from looking abandoned
+                loop_time = asyncio.get_running_loop().time()
+                if loop_time - last_touch > STREAM_PENDING_TIMEOUT_MS / 2000:
+                    last_touch = loop_time
+                    await self.touch_inflight_entries()
+
+                # Reclaim entries left pending by a crashed or stalled consumer
+                if loop_time - last_claim > STREAM_PENDING_TIMEOUT_MS / 1000:
+                    last_claim = loop_time
+                    entries.extend(await self.claim_pending_entries())
+
+                if not entries:
+                    response = await self.redis_client.xreadgroup(
+                        self.stream_group,
+                        self.stream_consumer,
+                        {stream: ">" for stream in self.task_streams},
+                        count=STREAM_BATCH_SIZE,
+                        block=STREAM_BLOCK_MS
+                    )
+                    for stream, messages in response or []:
+                        entries.extend((stream, entry_id, fields) for entry_id, fields in messages)
+
+                if entries:
+                    await self.submit_stream_batch(entries)
+
+            except redis.ConnectionError as e:
+                print(f"⚠️  Stream read failed: {e}")
+                await asyncio.sleep(5)
+
+    async def touch_inflight_entries(self):
+        """Reset the idle time of every entry this process still holds (XCLAIM JUSTID to itself)"""
+        if not self.stream_inflight:
+            return
+        by_stream = defaultdict(list)
+        for stream, entry_id in self.stream_inflight:
+            by_stream[stream].append(entry_id)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for stream, entry_ids in by_stream.items():
+                pipe.xclaim(stream, self.stream_group, self.stream_consumer, 0, entry_ids, justid=True)
+            await pipe.execute()
+
+    async def claim_pending_entries(self):
+        """
+        Take over entries pending longer than the redelivery timeout
+        Entries this process is still working on are skipped; entries delivered
+        STREAM_MAX_DELIVERIES times already are acked and dropped.
+        """
+        claimed = []
+        for stream in self.task_streams:
+            response = await self.redis_client.xautoclaim(
+                stream,
+                self.stream_group,
+                self.stream_consumer,
+                min_idle_time=STREAM_PENDING_TIMEOUT_MS,
+                count=STREAM_BATCH_SIZE
+            )
+            for entry_id, fields in response[1]:
+                if not fields or (stream, entry_id) in self.stream_inflight:
+                    continue
+                pending = await self.redis_client.xpending_range(
+                    stream, self.stream_group, min=entry_id, max=entry_id, count=1
+                )
+                if pending and pending[0]["times_delivered"] > STREAM_MAX_DELIVERIES:
+                    print(f"🗑️  Dropping task {entry_id} after {STREAM_MAX_DELIVERIES} failed deliveries")
+                    self.pending_acks[stream].append(entry_id)
+                    continue
+                claimed.append((stream, entry_id, fields))
+        if claimed:
+            print(f"♻️  Reclaimed {len(claimed)} pending task(s)")
+        return claimed
+
+    async def submit_stream_batch(self, entries):
+        """
+        Queue a batch of stream entries, high lane first
+        Each is acked once processed successfully; a failed one stays pending and is
+        redelivered after the pending timeout.
+        """
+        entries.sort(key=lambda entry: STREAM_LANES.index(entry[0].rsplit(":", 1)[1]))
+
+        for stream, entry_id, fields in entries:
+            if (stream, entry_id) in self.stream_inflight:
+                continue
+            try:
+                data = json_loads(fields["data"])
+            except (KeyError, ValueError) as e:
+                print(f"❌ Malformed task {entry_id}: {e}")
+                self.pending_acks[stream].append(entry_id)
+                continue
+
+            print(f"\n📨 Received task: {data.get('task')}")
+            print(f"   From: {data.get('from')}")
+            print(f"   Session: {data.get('session_id')}")
+            self.stream_inflight.add((stream, entry_id))
+            await self.executor.submit(
+                data,
+                on_done=lambda succeeded, stream=stream, entry_id=entry_id: self.stream_entry_done(
+                    stream, entry_id, succeeded
+                )
+            )
+
+    def stream_entry_done(self, stream: str, entry_id: str, succeeded: bool):
+        """Ack a finished entry; a failed one is released for redelivery"""
+        self.stream_inflight.discard((stream, entry_id))
+        if succeeded:
+            self.pending_acks[stream].append(entry_id)
+
+    async def flush_stream_acks(self):
+        """Ack every finished entry in one pipelined round trip"""
+        if not any(self.pending_acks.values()):
+            return
+
+        acks, self.pending_acks = self.pending_acks, defaultdict(list)
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for stream, entry_ids in acks.items():
+                if entry_ids:
+                    pipe.xack(stream, self.stream_group, *entry_ids)
+            await pipe.execute()
+
     async def process_task(self, task_data: Dict[str, Any]):
         """Process a task received from another LLM"""
         task = task_data.get("task")
         context = task_data.get("context", {})
         session_id = task_data.get("session_id")
 
+        # Results are terminal; answering them would bounce results between peers forever
+        if task == "task_result":
+            print(f"📬 Result from {task_data.get('from')} for session {session_id}")
+            return
+
         print(f"\n⚙️  Processing: {task}")
 
-        # Determine if this task is for Claude or Codex
-        if "claude" in self.instance_name:
-            result = await self.run_claude_task(task, context)
-        elif "codex" in self.instance_name:
-            result = await self.run_codex_task(task, context)
+        # Identical work is served from the shared cache or waits on the one running copy
+        if self.result_cache:
+            result = await self.result_cache.get_or_run(
+                self.kind, task, context, lambda: self.execute_task(task, context)
+            )
         else:
-            result = {"error": "Unknown LLM type"}
+            result = await self.execute_task(task, context)
 
         # Send result back
         await self.send_result(task_data.get("from"), session_id, result)
 
+    async def execute_task(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a task locally"""
+        # Determine if this task is for Claude or Codex
+        if task in CPU_BOUND_TASKS:
+            return await self.executor.run_cpu_bound(CPU_BOUND_TASKS[task], context)
+        elif self.kind == "claude":
+            return await self.run_claude_task(task, context)
+        elif self.kind == "codex":
+            return await self.run_codex_task(task, context)
+        return {"error": "Unknown LLM type"}
+
     async def run_claude_task(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """
         Run a task using Claude Code CLI
@@ -108,7 +1000,32 @@ class LLMCoordinator:
         # Example: Use Claude to analyze an idea
         if task == "process_new_idea":
             idea = context.get("idea", {})
-            prompt = f"""
+            uniqueness = context.get("uniqueness")
+
+            # The API already scored uniqueness by vector k-NN; near-duplicates skip analysis
+            if uniqueness and uniqueness.get("near_duplicate"):
+                nearest = uniqueness.get("nearest", [])
+                print(f"♻️  Near-duplicate (uniqueness {uniqueness['score']}), skipping analysis")
+                return {
+                    "uniqueness_score": uniqueness["score"],
+                    "near_duplicate": True,
+                    "similar_ideas": nearest,
+                    "analysis": "Near-duplicate of an existing idea.",
+                    "next_steps": ["Review the existing idea", "Refine what makes this one different"]
+                }
+
+            if uniqueness:
+                prompt = f"""
+            Analyze this idea for quality:
+            Title: {idea.get('title')}
+            Description: {idea.get('description')}
+
+            Its nearest existing ideas are {[n.get('title') for n in uniqueness.get('nearest', [])]}
+            (uniqueness {uniqueness['score']}). Rate quality (0-1).
+            Respond in JSON format.
+            """
+            else:
+                prompt = f"""
             Analyze this idea for uniqueness and quality:
             Title: {idea.get('title')}
             Description: {idea.get('description')}
@@ -117,16 +1034,53 @@ class LLMCoordinator:
             Respond in JSON format.
             """
 
-            # In a real implementation, you'd invoke Claude CLI or API here
-            # For now, return a mock response
+            answer = await self.ask_cli(prompt)
+            if answer is not None:
+                return answer
+
+            # No CLI on this host: placeholder response
             return {
-                "uniqueness_score": 0.75,
+                "uniqueness_score": uniqueness["score"] if uniqueness else 0.75,
                 "quality_score": 0.80,
                 "analysis": "This is a novel approach with good potential.",
-                "next_steps": ["Generate PRD", "Create initial code structure"]
+                "next_steps": ["Generate PRD", "Create initial code structure"],
+                "placeholder": True
             }
 
-        return {"status": "completed", "task": task}
+        return {"status": "completed", "task": task, "placeholder": True}
+
+    async def ask_cli(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Run a prompt on a pooled CLI worker (None when this host has no CLI)
+        A JSON answer is returned as-is, anything else under "analysis"; usage is kept
+        so the result cache can count the tokens it saves.
+        """
+        if self.cli_pool is None:
+            return None
+        try:
+            reply = await self.cli_pool.run({"type": "user", "message": {"role": "user", "content": prompt}})
+        except CLIWorkerError as e:
+            return {"error": str(e)}
+        if reply.get("is_error"):
+            return {"error": reply.get("result") or reply.get("subtype") or "CLI error"}
+
+        text = (reply.get("result") or "").strip()
+        if text.startswith("```"):
+            text = text.strip("`").removeprefix("json").strip()
+        try:
+            answer = json_loads(text)
+        except ValueError:
+            answer = None
+        if not isinstance(answer, dict):
+            answer = {"analysis": reply.get("result")}
+        if reply.get("usage"):
+            usage = reply["usage"]
+            answer["usage"] = {
+                **usage,
+                "total_tokens": usage.get("total_tokens")
+                or (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+            }
+        return answer
 
     async def run_codex_task(self, task: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -139,7 +1093,15 @@ class LLMCoordinator:
         if task == "generate_code_structure":
             idea = context.get("idea", {})
 
-            # In a real implementation, invoke Codex CLI here
+            answer = await self.ask_cli(
+                f"Create the initial code structure for this idea and commit it:\n"
+                f"Title: {idea.get('title')}\nDescription: {idea.get('description')}\n"
+                f"Respond in JSON with files_created, git_commit and status."
+            )
+            if answer is not None:
+                return answer
+
+            # No CLI on this host: placeholder response
             return {
                 "files_created": [
                     "src/main.py",
@@ -147,15 +1109,17 @@ class LLMCoordinator:
                     "README.md"
                 ],
                 "git_commit": "abc123",
-                "status": "completed"
+                "status": "completed",
+                "placeholder": True
             }
 
-        return {"status": "completed", "task": task}
+        return {"status": "completed", "task": task, "placeholder": True}
 
     async def send_result(self, to_llm: str, session_id: str, result: Dict[str, Any]):
-        """Send result to another LLM"""
-        import httpx
-
+        """Queue a result for another LLM; results go out in batches"""
+        if not to_llm:
+            print(f"⚠️  Task in session {session_id} named no sender, result not sent")
+            return
         message = {
             "from_llm": self.instance_name,
             "to_llm": to_llm,
@@ -165,19 +1129,75 @@ class LLMCoordinator:
             "priority": 1
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "http://localhost:8000/api/llm/message",
-                json=message
-            )
-            print(f"✉️  Sent result to {to_llm}")
+        self.result_buffer.append(message)
+        overflow = len(self.result_buffer) - RESULT_BUFFER_MAX
+        if overflow > 0:
+            del self.result_buffer[:overflow]
+            self.results_dropped += overflow
+            print(f"🗑️  Result buffer full, dropped {overflow} oldest result(s)")
+        if len(self.result_buffer) >= RESULT_BATCH_SIZE:
+            self.results_ready.set()
+
+    async def flush_results(self):
+        """Post buffered results to the batch endpoint"""
+        while self.running:
+            try:
+                await asyncio.wait_for(self.results_ready.wait(), RESULT_BATCH_MS / 1000)
+            except asyncio.TimeoutError:
+                pass
+            self.results_ready.clear()
+            await self.send_result_batch()
+
+    async def send_result_batch(self):
+        """Send buffered results, up to RESULT_BATCH_SIZE per request, until one fails transiently"""
+        while self.result_buffer:
+            batch = self.result_buffer[:RESULT_BATCH_SIZE]
+            settled = await self.post_results(batch)
+            del self.result_buffer[:settled]
+            if settled < len(batch):
+                return
+
+    async def post_results(self, batch: List[Dict[str, Any]]) -> int:
+        """
+        POST a batch; returns how many messages from its start were settled (sent or dropped)
+        A batch the API rejects outright (4xx) is split in halves to find the bad
+        messages, which are dropped; anything else is left for the next flush.
+        """
+        try:
+            response = await self.http_client.post("/api/llm/message/batch", json=batch)
+        except httpx.HTTPError as e:
+            print(f"⚠️  Sending {len(batch)} result(s) failed, will retry: {e}")
+            return 0
 
-    async def delegate_to_peer(self, task: str, context: Dict[str, Any], to_llm: str):
-        """Delegate a task to another LLM instance"""
-        import httpx
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            if len(batch) == 1:
+                self.results_dropped += 1
+                print(f"🗑️  Dropping result for {batch[0]['to_llm']}, rejected with "
+                      f"{response.status_code}: {response.text[:200]}")
+                return 1
+            middle = len(batch) // 2
+            settled = await self.post_results(batch[:middle])
+            if settled < middle:
+                return settled
+            return middle + await self.post_results(batch[middle:])
+
+        if response.is_error:
+            print(f"⚠️  Sending {len(batch)} result(s) failed with {response.status_code}, will retry")
+            return 0
+        for message in batch:
+            print(f"✉️  Sent result to {message['to_llm']}")
+        return len(batch)
+
+    async def delegate_to_peer(self, task: str, context: Dict[str, Any], to_llm: str = "auto",
+                               session_id: Optional[str] = None):
+        """
+        Delegate a task to another LLM instance
+        "auto" (or "auto:claude" / "auto:codex") lets the API pick the least-loaded
+        live instance; reusing a session_id keeps follow-ups on the same one.
+        """
         import uuid
 
-        session_id = str(uuid.uuid4())
+        session_id = session_id or str(uuid.uuid4())
 
         message = {
             "from_llm": self.instance_name,
@@ -188,26 +1208,37 @@ class LLMCoordinator:
             "priority": 1
         }
 
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                "http://localhost:8000/api/llm/message",
-                json=message
-            )
-            print(f"📤 Delegated '{task}' to {to_llm}")
+        response = await self.http_client.post("/api/llm/message", json=message)
+        print(f"📤 Delegated '{task}' to {response.json().get('routed_to', to_llm)}")
 
     async def run(self):
         """Main run loop"""
         await self.connect()
+        self.executor.start()
 
         # Start heartbeat and listening tasks concurrently
+        if DELIVERY_MODE == "streams":
+            listener = self.listen_for_stream_tasks()
+        else:
+            listener = self.listen_with_reconnect()
+
         await asyncio.gather(
             self.send_heartbeat(),
-            self.listen_for_tasks()
+            self.flush_results(),
+            listener
         )
 
     async def shutdown(self):
         """Clean shutdown"""
         self.running = False
+        await self.executor.close()
+        if self.cli_pool:
+            await self.cli_pool.close()
+        if self.http_client:
+            await self.send_result_batch()
+            await self.http_client.aclose()
+        if self.redis_client:
+            await self.flush_stream_acks()
         if self.websocket:
             await self.websocket.close()
         if self.redis_client:
@@ -0,0 +1,116 @@
+"""
+Codec benchmark: bytes on the wire and CPU per message for stdlib json, the
+fast JSON backend and MessagePack, on payloads shaped like real traffic
+
+Run from services/api:  python benchmarks/codec_bench.py [iterations]
+"""
+
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import codec  # noqa: E402
+
+
+def random_words(rng: random.Random, count: int) -> str:
+    return " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(count))
+
+
+def llm_message(rng: random.Random) -> dict:
+    """Code-generation hand-off: file list, a unified diff and analysis notes"""
+    files = [f"src/{random_words(rng, 1)}/{random_words(rng, 1)}_{i}.py" for i in range(150)]
+    diff = "\n".join(
+        f"{rng.choice('+- ')} {random_words(rng, rng.randint(4, 12))}" for _ in range(600)
+    )
+    return {
+        "from": "codex-hpc",
+        "to": "claude-rpi5",
+        "task": "review_code_structure",
+        "session_id": f"idea-{rng.random()}",
+        "priority": 2,
+        "timestamp": datetime.utcnow().isoformat(),
+        "context": {
+            "files": files,
+            "diff": diff,
+            "metrics": {name: rng.random() for name in ("coverage", "complexity", "uniqueness", "quality")},
+            "notes": [random_words(rng, 20) for _ in range(10)]
+        }
+    }
+
+
+def trail_entries(rng: random.Random, count: int) -> list:
+    """A page of stored paper-trail entries (already-encoded JSON strings)"""
+    return [
+        json.dumps({
+            "action": rng.choice(["created", "refined", "commented", "approved"]),
+            "data": {"summary": random_words(rng, 25), "author": f"user-{rng.randint(1, 50)}", "score": rng.random()},
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        for _ in range(count)
+    ]
+
+
+def timed(fn, iterations: int) -> float:
+    """Mean microseconds per call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def report(name: str, size: int, encode_us: float, decode_us: float, baseline=None):
+    line = f"  {name:<10} {size:>9,} B  encode {encode_us:>8.1f} µs  decode {decode_us:>8.1f} µs"
+    if baseline:
+        base_size, base_encode, base_decode = baseline
+        line += (f"   ({size / base_size:.0%} size, {encode_us / base_encode:.0%} encode,"
+                 f" {decode_us / base_decode:.0%} decode)")
+    print(line)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(42)
+    message = llm_message(rng)
+
+    print(f"JSON backend: {codec.JSON_BACKEND}, MessagePack: {'yes' if codec.msgpack_available() else 'no'}")
+    print(f"\nLLM message with file list + diff ({iterations} iterations)")
+
+    text = json.dumps(message)
+    baseline = (len(text.encode()), timed(lambda: json.dumps(message), iterations),
+                timed(lambda: json.loads(text), iterations))
+    report("stdlib", *baseline)
+
+    fast = codec.dumps_bytes(message)
+    report(codec.JSON_BACKEND, len(fast), timed(lambda: codec.dumps_bytes(message), iterations),
+           timed(lambda: codec.loads(fast), iterations), baseline)
+
+    if codec.msgpack_available():
+        packed = codec.pack(message)
+        report("msgpack", len(packed), timed(lambda: codec.pack(message), iterations),
+               timed(lambda: codec.unpack(packed), iterations), baseline)
+        print(f"  JSON→msgpack transcode (once per message per worker): "
+              f"{timed(lambda: codec.json_to_msgpack(fast), iterations):.1f} µs")
+
+    # Paper-trail page: decode every stored entry and re-encode vs. splice the stored strings
+    entries = trail_entries(rng, 100)
+    envelope = {"entity_type": "idea", "entity_id": "42", "total": 100, "next_cursor": None}
+
+    def reencode():
+        return json.dumps({**envelope, "trail": [json.loads(entry) for entry in entries]})
+
+    def splice():
+        return codec.splice_list(envelope, "trail", entries)
+
+    print(f"\nPaper-trail page of {len(entries)} entries")
+    print(f"  decode + re-encode (stdlib) {timed(reencode, iterations):>8.1f} µs")
+    print(f"  pass-through splice         {timed(splice, iterations):>8.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Ledger benchmark: chaining and sealing a million entries, then proving inclusion
+with Merkle paths vs. re-verifying the hash chain from genesis
+
+Run from services/api:  python benchmarks/ledger_bench.py [entries] [block_size]
+"""
+
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ledger  # noqa: E402
+
+
+def build(entries: int, block_size: int):
+    """Chain every entry incrementally and seal each full block; returns rows, block levels, block roots"""
+    rng = random.Random(42)
+    entity_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(1000)]
+    started_at = datetime(2025, 1, 1)
+
+    rows, blocks, roots = [], [], []
+    previous_hash = ledger.GENESIS_HASH
+    for seq in range(1, entries + 1):
+        row = {
+            "seq": seq,
+            "entity_type": "idea",
+            "entity_id": rng.choice(entity_ids),
+            "action": rng.choice(["created", "modified", "minted", "transferred"]),
+            "timestamp": (started_at + timedelta(seconds=seq)).isoformat(),
+            "metadata": {"value": rng.randint(0, 1000)},
+            "previous_hash": previous_hash
+        }
+        row["current_hash"] = previous_hash = ledger.entry_hash(
+            row["previous_hash"], seq, row["entity_type"], row["entity_id"], row["action"],
+            row["timestamp"], row["metadata"]
+        )
+        rows.append(row)
+
+        if seq % block_size == 0:
+            levels = ledger.merkle_levels([ledger.leaf_node(r["current_hash"]) for r in rows[-block_size:]])
+            blocks.append(levels)
+            roots.append(levels[-1][0])
+    return rows, blocks, roots
+
+
+def verify_chain(rows, upto: int) -> bool:
+    """Naive check: rehash the chain from genesis through entry `upto`"""
+    previous_hash = ledger.GENESIS_HASH
+    for row in rows[:upto]:
+        previous_hash = ledger.entry_hash(
+            previous_hash, row["seq"], row["entity_type"], row["entity_id"], row["action"],
+            row["timestamp"], row["metadata"]
+        )
+    return previous_hash == rows[upto - 1]["current_hash"]
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    block_size = int(sys.argv[2]) if len(sys.argv) > 2 else ledger.LEDGER_BLOCK_SIZE
+
+    started = time.perf_counter()
+    rows, blocks, roots = build(entries, block_size)
+    elapsed = time.perf_counter() - started
+    print(f"Append + seal {entries:,} entries in blocks of {block_size}: {elapsed:.1f} s "
+          f"({elapsed / entries * 1e6:.1f} µs/entry, {len(blocks):,} blocks)")
+
+    started = time.perf_counter()
+    block_levels = ledger.merkle_levels(roots)
+    print(f"Ledger root over {len(roots):,} block roots: {(time.perf_counter() - started) * 1e3:.2f} ms")
+
+    rng = random.Random(7)
+    sealed = len(blocks) * block_size
+    samples = [rng.randrange(sealed) for _ in range(1000)]
+
+    # Proof generation, as served: one block's leaves (cached levels here) plus the block-root tree
+    started = time.perf_counter()
+    proofs = []
+    for index in samples:
+        block_number, leaf = divmod(index, block_size)
+        proofs.append({
+            "block": {"merkle_root": blocks[block_number][-1][0].hex()},
+            "entry_path": ledger.merkle_proof(blocks[block_number], leaf),
+            "block_path": ledger.merkle_proof(block_levels, block_number),
+            "ledger_root": block_levels[-1][0].hex()
+        })
+    prove_us = (time.perf_counter() - started) / len(samples) * 1e6
+
+    started = time.perf_counter()
+    assert all(ledger.verify_inclusion(rows[index], proof) for index, proof in zip(samples, proofs))
+    verify_us = (time.perf_counter() - started) / len(samples) * 1e6
+
+    steps = sum(len(p["entry_path"]) + len(p["block_path"]) for p in proofs) / len(proofs)
+    print(f"\nInclusion proofs ({len(samples)} random sealed entries)")
+    print(f"  proof size     {steps:.1f} hashes (~{steps * 64:.0f} B hex)")
+    print(f"  generate       {prove_us:>10.1f} µs")
+    print(f"  verify         {verify_us:>10.1f} µs")
+
+    # Naive verification rehashes everything before the entry; time a handful
+    naive = samples[:5]
+    started = time.perf_counter()
+    assert all(verify_chain(rows, index + 1) for index in naive)
+    naive_us = (time.perf_counter() - started) / len(naive) * 1e6
+    print(f"  chain from genesis (naive) {naive_us:>10.1f} µs  ({naive_us / verify_us:,.0f}x slower)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Antimony Labs - Serialization codecs
+Fast JSON (orjson, then msgspec, then stdlib) for every internal hop, and an
+optional MessagePack envelope that clients negotiate per WebSocket (?codec=msgpack)
+or per request (Content-Type / Accept: application/msgpack)
+"""
+
+import json
+from typing import Any, List, Optional, Union
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack")
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # Integers beyond 64 bits and other types orjson refuses
+            return json.dumps(obj).encode()
+
+    loads = orjson.loads
+elif msgspec is not None:
+    JSON_BACKEND = "msgspec"
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+
+    def dumps_bytes(obj: Any) -> bytes:
+        try:
+            return _encoder.encode(obj)
+        except TypeError:
+            return json.dumps(obj).encode()
+
+    def loads(data: Union[str, bytes]) -> Any:
+        try:
+            return _decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+else:
+    JSON_BACKEND = "json"
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+    loads = json.loads
+
+
+def dumps(obj: Any) -> str:
+    """JSON text, as stored in Redis and sent in text frames"""
+    return dumps_bytes(obj).decode()
+
+
+def splice_list(obj: dict, field: str, items: List[str]) -> str:
+    """Encode `obj` with `field` set to a list of already-encoded JSON values, without re-encoding them"""
+    head = dumps(obj)
+    separator = "," if obj else ""
+    return f'{head[:-1]}{separator}{dumps(field)}:[{",".join(items)}]}}'
+
+
+# ----------------------------------------------------------------------------
+# MessagePack
+# ----------------------------------------------------------------------------
+
+def msgpack_available() -> bool:
+    return msgpack is not None
+
+
+def pack(obj: Any) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def unpack(data: bytes) -> Any:
+    try:
+        return msgpack.unpackb(data, raw=False)
+    except (msgpack.ExtraData, msgpack.FormatError, msgpack.StackError, ValueError) as e:
+        raise ValueError(f"Invalid MessagePack: {e}") from e
+
+
+def json_to_msgpack(text: Union[str, bytes]) -> bytes:
+    """Transcode one JSON payload to MessagePack"""
+    return pack(loads(text))
+
+
+def pack_batch(items: List[bytes]) -> bytes:
+    """{"type": "batch", "messages": [...]} from already-packed messages"""
+    packer = msgpack.Packer(use_bin_type=True)
+    return (
+        packer.pack_map_header(2) + packer.pack("type") + packer.pack("batch")
+        + packer.pack("messages") + packer.pack_array_header(len(items)) + b"".join(items)
+    )
+
+
+def encode(obj: Any, codec: str) -> Union[str, bytes]:
+    """Frame payload for a socket using `codec` ("json" or "msgpack")"""
+    return pack(obj) if codec == "msgpack" else dumps(obj)
+
+
+def decode(data: Union[str, bytes]) -> Any:
+    """Text frames are JSON, binary frames are MessagePack"""
+    return unpack(data) if isinstance(data, bytes) else loads(data)
+
+
+def is_msgpack(media_type: Optional[str]) -> bool:
+    return bool(media_type) and media_type.split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    return bool(accept) and any(is_msgpack(part) for part in accept.split(","))
+
+
+# ----------------------------------------------------------------------------
+# HTTP integration
+# ----------------------------------------------------------------------------
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by the fast backend"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+
+class CodecRequest(Request):
+    """Parses JSON bodies with the fast backend and MessagePack bodies with msgpack"""
+
+    def __init__(self, scope, receive):
+        self.body_codec = "json"
+        headers = scope.get("headers", [])
+        content_type = next((value.decode("latin-1") for name, value in headers if name == b"content-type"), None)
+        if is_msgpack(content_type) and msgpack_available():
+            # Present the body as JSON so FastAPI hands it to json(), which unpacks it
+            self.body_codec = "msgpack"
+            scope = {**scope, "headers": [
+                (name, b"application/json" if name == b"content-type" else value) for name, value in headers
+            ]}
+        super().__init__(scope, receive)
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            body = await self.body()
+            self._json = unpack(body) if self.body_codec == "msgpack" else loads(body)
+        return self._json
+
+
+class CodecRoute(APIRoute):
+    """Route class adding MessagePack request bodies and `Accept: application/msgpack` responses"""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def codec_handler(request: Request) -> Response:
+            request = CodecRequest(request.scope, request.receive)
+            response = await handler(request)
+            if (accepts_msgpack(request.headers.get("accept")) and msgpack_available()
+                    and response.media_type == "application/json"):
+                headers = {
+                    name: value for name, value in response.headers.items()
+                    if name not in ("content-length", "content-type")
+                }
+                return Response(
+                    json_to_msgpack(response.body), status_code=response.status_code,
+                    headers=headers, media_type=MSGPACK_MEDIA_TYPE
+                )
+            return response
+
+        return codec_handler
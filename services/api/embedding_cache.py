@@ -0,0 +1,142 @@
+"""
+Antimony Labs - Embedding cache
+Content-addressed by (model, normalized text): an in-process LRU in front of a
+shared Redis tier holding compact float16/float32 blobs
+"""
+
+import asyncio
+import hashlib
+import os
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Callable, Awaitable
+
+import numpy as np
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", str(30 * 86400)))
+EMBEDDING_CACHE_DTYPE = os.getenv("EMBEDDING_CACHE_DTYPE", "float16")  # float16 or float32
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivially different copies share a key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    digest = hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode()).hexdigest()
+    return f"emb:{digest}"
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache shared by every encoder in the API
+    The Redis tier is shared across API workers; concurrent requests for the same
+    text inside one worker wait on a single encode.
+    """
+
+    def __init__(self, redis_client, model_name: str, max_entries: int = EMBEDDING_CACHE_SIZE,
+                 ttl_seconds: int = EMBEDDING_CACHE_TTL_SECONDS, dtype: str = EMBEDDING_CACHE_DTYPE):
+        # redis_client must not decode responses: values are raw vector bytes
+        self.redis_client = redis_client
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.dtype = np.dtype(dtype)
+        self.lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.inflight: Dict[str, asyncio.Future] = {}
+
+        # Metrics
+        self.lru_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.inflight_waits = 0
+
+    def _remember(self, key: str, vector: List[float]):
+        self.lru[key] = vector
+        self.lru.move_to_end(key)
+        while len(self.lru) > self.max_entries:
+            self.lru.popitem(last=False)
+
+    async def get_or_compute(self, texts: List[str],
+                             compute: Callable[[List[str]], Awaitable[List[List[float]]]]) -> List[List[float]]:
+        """
+        Return one vector per text, calling `compute` only for texts found in
+        neither tier (each distinct text at most once)
+        """
+        keys = [cache_key(self.model_name, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+
+        # Tier 1: in-process LRU
+        for key in keys:
+            if key in self.lru and key not in found:
+                self.lru.move_to_end(key)
+                found[key] = self.lru[key]
+                self.lru_hits += 1
+
+        # Tier 2: Redis, one MGET for everything the LRU missed
+        lookup = list(dict.fromkeys(key for key in keys if key not in found))
+        if lookup:
+            for key, blob in zip(lookup, await self.redis_client.mget(lookup)):
+                if blob is not None:
+                    vector = np.frombuffer(blob, dtype=self.dtype).astype(np.float32).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.redis_hits += 1
+
+        # Misses: join an in-flight encode or compute once per distinct text
+        waiting: Dict[str, asyncio.Future] = {}
+        to_compute: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in to_compute or key in waiting:
+                continue
+            if key in self.inflight:
+                waiting[key] = self.inflight[key]
+                self.inflight_waits += 1
+            else:
+                to_compute[key] = text
+
+        if to_compute:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in to_compute}
+            self.inflight.update(futures)
+            try:
+                vectors = await compute(list(to_compute.values()))
+                computed = dict(zip(to_compute, vectors))
+                self.misses += len(computed)
+                await self._store(computed)
+                found.update(computed)
+                for key, future in futures.items():
+                    future.set_result(computed[key])
+            except Exception as e:
+                for future in futures.values():
+                    future.set_exception(e)
+                    future.exception()  # Marked retrieved; waiters still see it
+                raise
+            finally:
+                for key in futures:
+                    self.inflight.pop(key, None)
+
+        for key, future in waiting.items():
+            found[key] = await future
+
+        return [found[key] for key in keys]
+
+    async def _store(self, computed: Dict[str, List[float]]):
+        """Write fresh vectors to both tiers"""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for key, vector in computed.items():
+                self._remember(key, vector)
+                pipe.set(key, np.asarray(vector, dtype=self.dtype).tobytes(), ex=self.ttl_seconds)
+            await pipe.execute()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.lru_hits + self.redis_hits + self.misses
+        return {
+            "entries": len(self.lru),
+            "lru_hits": self.lru_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "inflight_waits": self.inflight_waits,
+            "hit_rate": round((self.lru_hits + self.redis_hits) / lookups, 4) if lookups else None
+        }
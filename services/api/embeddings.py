@@ -0,0 +1,218 @@
+"""
+Antimony Labs - Embedding pipeline
+Micro-batches paper-trail events through sentence-transformers in a worker process
+and upserts the vectors into Qdrant in bulk
+"""
+
+import asyncio
+import importlib.util
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List
+
+from qdrant_client.http import models as qdrant_models
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_MAX_LATENCY_MS = int(os.getenv("EMBEDDING_MAX_LATENCY_MS", "500"))
+EMBEDDING_QUEUE_SIZE = int(os.getenv("EMBEDDING_QUEUE_SIZE", "10000"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "1"))
+
+TRAIL_COLLECTION = "paper_trail"
+
+# ----------------------------------------------------------------------------
+# Worker process side: the model is loaded once per process by the initializer
+# ----------------------------------------------------------------------------
+
+_model = None
+
+
+def _load_model(model_name: str):
+    global _model
+    from sentence_transformers import SentenceTransformer
+    _model = SentenceTransformer(model_name)
+
+
+def _dimension() -> int:
+    return _model.get_sentence_embedding_dimension()
+
+
+def _encode(texts: List[str]) -> List[List[float]]:
+    return _model.encode(texts, batch_size=len(texts), normalize_embeddings=True).tolist()
+
+
+# ----------------------------------------------------------------------------
+# API side
+# ----------------------------------------------------------------------------
+
+def event_text(entity_type: str, action: str, data: Dict[str, Any]) -> str:
+    """Text embedded for a paper-trail event: its string fields, or the raw data"""
+    text_fields = [value for value in data.values() if isinstance(value, str)]
+    body = " ".join(text_fields) if text_fields else json.dumps(data, sort_keys=True)
+    return f"{entity_type} {action}: {body}"
+
+
+def point_id(key: str, entry: str) -> str:
+    """Deterministic Qdrant point ID, so re-embedding an event overwrites it"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{key}\n{entry}"))
+
+
+class EmbeddingPipeline:
+    """
+    Queues texts, groups them into batches of up to `batch_size` (or whatever
+    arrived within `max_latency_ms`), encodes each batch in a worker process and
+    upserts the batch to Qdrant with one request. The event loop never runs the model.
+    """
+
+    def __init__(self, qdrant_client, cache=None, model_name: str = EMBEDDING_MODEL,
+                 batch_size: int = EMBEDDING_BATCH_SIZE, max_latency_ms: int = EMBEDDING_MAX_LATENCY_MS,
+                 queue_size: int = EMBEDDING_QUEUE_SIZE, workers: int = EMBEDDING_WORKERS):
+        self.qdrant_client = qdrant_client
+        self.cache = cache
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_latency_ms = max_latency_ms
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.workers = workers
+        self.process_pool = None
+        self.task = None
+        self.dimension = None
+        # Collections known to exist; the rest are (re)checked on next use
+        self.collections = set()
+
+        # Instrumentation
+        self.enqueued = 0
+        self.dropped = 0
+        self.embedded = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.last_batch_size = 0
+        self.last_batch_latency_ms = 0.0
+        self.avg_batch_latency_ms = 0.0
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec("sentence_transformers") is not None
+
+    async def start(self):
+        """Spawn the model worker(s) and start batching; Qdrant being down doesn't stop either"""
+        self.process_pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_load_model,
+            initargs=(self.model_name,)
+        )
+        loop = asyncio.get_running_loop()
+        self.dimension = await loop.run_in_executor(self.process_pool, _dimension)
+        try:
+            await self.ensure_collection(TRAIL_COLLECTION)
+        except Exception as e:
+            print(f"⚠️  Qdrant collection {TRAIL_COLLECTION} not ready, retrying on first batch: {e}")
+        self.task = asyncio.create_task(self._run())
+
+    async def ensure_collection(self, name: str):
+        """Create the collection if missing; raises while Qdrant is unreachable"""
+        if name in self.collections:
+            return
+        try:
+            await self.qdrant_client.get_collection(name)
+        except Exception:
+            await self.qdrant_client.create_collection(
+                collection_name=name,
+                vectors_config=qdrant_models.VectorParams(
+                    size=self.dimension, distance=qdrant_models.Distance.COSINE
+                )
+            )
+        self.collections.add(name)
+
+    def enqueue(self, point: str, text: str, payload: Dict[str, Any]) -> bool:
+        """Queue one text for embedding; returns False (and counts a drop) when the queue is full"""
+        try:
+            self.queue.put_nowait((point, text, payload))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        """Encode texts in the worker process"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.process_pool, _encode, texts)
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """Vectors for texts, encoding only those the cache has never seen"""
+        if self.cache is None:
+            return await self.encode(texts)
+        return await self.cache.get_or_compute(texts, self.encode)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_latency_ms / 1000
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._process(batch)
+
+    async def _process(self, batch):
+        started = time.perf_counter()
+        try:
+            vectors = await self.embed([text for _, text, _ in batch])
+            await self.ensure_collection(TRAIL_COLLECTION)
+            await self.qdrant_client.upsert(
+                collection_name=TRAIL_COLLECTION,
+                points=[
+                    qdrant_models.PointStruct(id=point, vector=vector, payload=payload)
+                    for (point, _, payload), vector in zip(batch, vectors)
+                ],
+                wait=False
+            )
+        except Exception as e:
+            self.failed_batches += 1
+            print(f"⚠️  Embedding batch of {len(batch)} failed: {e}")
+            return
+
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.batches += 1
+        self.embedded += len(batch)
+        self.last_batch_size = len(batch)
+        self.last_batch_latency_ms = latency_ms
+        # Exponentially weighted so the figure tracks recent load
+        self.avg_batch_latency_ms = latency_ms if self.batches == 1 else (
+            0.9 * self.avg_batch_latency_ms + 0.1 * latency_ms
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backlog": self.queue.qsize(),
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "embedded": self.embedded,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_latency_ms": round(self.last_batch_latency_ms, 1),
+            "avg_batch_latency_ms": round(self.avg_batch_latency_ms, 1)
+        }
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,211 @@
+"""
+Antimony Labs - Idea lookups
+PostgreSQL behind a short-TTL Redis read-through cache, invalidated through the
+`ideas:status` pub/sub channel whenever an idea's status changes
+"""
+
+import asyncio
+import os
+import uuid
+from typing import Dict, Iterable, List, Optional, Set
+
+import codec
+from ws_hub import SendQueue
+
+IDEA_CACHE_TTL_SECONDS = int(os.getenv("IDEA_CACHE_TTL_SECONDS", "30"))
+IDEA_MISSING_TTL_SECONDS = int(os.getenv("IDEA_MISSING_TTL_SECONDS", "5"))  # Negative cache for unknown ids
+IDEA_STATUS_CHANNEL = "ideas:status"
+IDEA_INVALIDATION_QUEUE_SIZE = 10000
+
+MISSING = ""  # Cached in place of a document for ids that don't exist
+
+# The whole document is built in PostgreSQL, so it is cached and served without re-encoding
+IDEAS_QUERY = """
+    SELECT i.id::text AS id, json_build_object(
+        'idea_id', i.id,
+        'user_id', i.user_id,
+        'title', i.title,
+        'description', i.description,
+        'category', i.category,
+        'status', i.status,
+        'uniqueness_score', i.uniqueness_score,
+        'quality_score', i.quality_score,
+        'created_at', i.created_at,
+        'updated_at', i.updated_at,
+        'metadata', i.metadata,
+        'prd', prd.doc,
+        'nft_tokens', COALESCE(nft.docs, '[]'::json)
+    )::text AS doc
+    FROM ideas i
+    LEFT JOIN LATERAL (
+        SELECT json_build_object(
+            'id', p.id, 'version', p.version, 'content', p.content,
+            'generated_by', p.generated_by, 'created_at', p.created_at
+        ) AS doc
+        FROM prds p WHERE p.idea_id = i.id
+        ORDER BY p.version DESC, p.created_at DESC LIMIT 1
+    ) prd ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+            'token_id', n.token_id, 'blockchain', n.blockchain, 'contract_address', n.contract_address,
+            'owner_id', n.owner_id, 'minted_at', n.minted_at, 'transaction_hash', n.transaction_hash,
+            'ipfs_hash', n.ipfs_hash, 'current_value', n.current_value
+        ) ORDER BY n.minted_at) AS docs
+        FROM nft_tokens n WHERE n.idea_id = i.id
+    ) nft ON TRUE
+    WHERE i.id = ANY($1::uuid[])
+"""
+
+
+def idea_key(idea_id: str) -> str:
+    return f"idea:{idea_id}"
+
+
+def normalize_id(idea_id: str) -> str:
+    """Canonical UUID text; raises ValueError for anything that isn't a UUID"""
+    return str(uuid.UUID(idea_id))
+
+
+class IdeaStore:
+    """
+    Read-through idea cache
+    Concurrent misses for the same id share one query, batches load every miss in
+    one query, and a load that races a status change is not written back.
+    """
+
+    def __init__(self, redis_client, db_pool, ttl_seconds: int = IDEA_CACHE_TTL_SECONDS):
+        self.redis_client = redis_client
+        self.db_pool = db_pool
+        self.ttl_seconds = ttl_seconds
+        self.loading: Dict[str, asyncio.Future] = {}
+        self.invalidated: Set[str] = set()  # Ids whose status changed while they were loading
+        self.queue = None
+        self.task = None
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.queries = 0
+        self.invalidations = 0
+
+    async def start(self, pubsub_hub):
+        """Listen for status changes through the shared pub/sub hub"""
+        self.queue = SendQueue(maxsize=IDEA_INVALIDATION_QUEUE_SIZE, policy="drop_oldest")
+        await pubsub_hub.register(self.queue, [IDEA_STATUS_CHANNEL])
+        self.task = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            data = await self.queue.get()
+            try:
+                idea_id = codec.loads(data)["idea_id"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            self.invalidations += 1
+            if idea_id in self.loading:
+                self.invalidated.add(idea_id)
+            try:
+                await self.redis_client.delete(idea_key(idea_id))
+            except Exception as e:
+                print(f"⚠️  Idea cache invalidation failed for {idea_id}: {e}")
+
+    async def get_many(self, idea_ids: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Encoded JSON document per normalized id (None when it doesn't exist)"""
+        idea_ids = list(dict.fromkeys(idea_ids))
+        cached = await self.redis_client.mget([idea_key(idea_id) for idea_id in idea_ids])
+
+        docs: Dict[str, Optional[str]] = {}
+        missing = []
+        for idea_id, doc in zip(idea_ids, cached):
+            if doc is None:
+                missing.append(idea_id)
+            else:
+                docs[idea_id] = doc or None
+        self.hits += len(docs)
+        self.misses += len(missing)
+
+        # Ids another request is already loading are awaited rather than queried again
+        waiting = {idea_id: self.loading[idea_id] for idea_id in missing if idea_id in self.loading}
+        to_load = [idea_id for idea_id in missing if idea_id not in waiting]
+        if to_load:
+            docs.update(await self._load(to_load))
+        for idea_id, future in waiting.items():
+            docs[idea_id] = await asyncio.shield(future)
+        return docs
+
+    async def get(self, idea_id: str) -> Optional[str]:
+        return (await self.get_many([idea_id]))[idea_id]
+
+    async def _load(self, idea_ids: List[str]) -> Dict[str, Optional[str]]:
+        loop = asyncio.get_running_loop()
+        futures = {idea_id: loop.create_future() for idea_id in idea_ids}
+        self.loading.update(futures)
+        try:
+            async with self.db_pool.acquire() as conn:
+                rows = await conn.fetch(IDEAS_QUERY, idea_ids)
+            self.queries += 1
+            found = {row["id"]: row["doc"] for row in rows}
+            docs = {idea_id: found.get(idea_id) for idea_id in idea_ids}
+
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for idea_id, doc in docs.items():
+                    if idea_id in self.invalidated:
+                        continue
+                    if doc is None:
+                        pipe.set(idea_key(idea_id), MISSING, ex=IDEA_MISSING_TTL_SECONDS)
+                    else:
+                        pipe.set(idea_key(idea_id), doc, ex=self.ttl_seconds)
+                await pipe.execute()
+
+            for idea_id, future in futures.items():
+                future.set_result(docs[idea_id])
+            return docs
+        except BaseException as e:
+            for future in futures.values():
+                future.set_exception(e)
+                future.exception()  # Marked retrieved; waiters still see it
+            raise
+        finally:
+            for idea_id in idea_ids:
+                del self.loading[idea_id]
+                self.invalidated.discard(idea_id)
+
+    async def update_status(self, idea_id: str, status: str) -> Optional[str]:
+        """Set an idea's status and broadcast the change; returns the updated_at timestamp, None if unknown"""
+        async with self.db_pool.acquire() as conn:
+            updated_at = await conn.fetchval(
+                "UPDATE ideas SET status = $2, updated_at = NOW() WHERE id = $1::uuid RETURNING updated_at",
+                idea_id, status
+            )
+        if updated_at is None:
+            return None
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.delete(idea_key(idea_id))
+            pipe.publish(IDEA_STATUS_CHANNEL, codec.dumps({
+                "idea_id": idea_id,
+                "status": status,
+                "updated_at": updated_at.isoformat()
+            }))
+            await pipe.execute()
+        return updated_at.isoformat()
+
+    def stats(self) -> Dict[str, int]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "queries": self.queries,
+            "invalidations": self.invalidations
+        }
+
+    async def close(self, pubsub_hub):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.queue:
+            await pubsub_hub.unregister(self.queue, [IDEA_STATUS_CHANNEL])
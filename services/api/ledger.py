@@ -0,0 +1,286 @@
+"""
+Antimony Labs - Append-only crypto ledger
+Every entry is hash-chained to the one before it as it is appended, and each run
+of LEDGER_BLOCK_SIZE entries is sealed under a Merkle root. An inclusion proof is
+the path from the entry to its block root plus the path from that block root to
+the root over all blocks, so it grows with log n, not with the ledger.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+LEDGER_BLOCK_SIZE = int(os.getenv("LEDGER_BLOCK_SIZE", "1024"))
+LEDGER_LOCK_KEY = 0x1ed6e7  # pg_advisory_xact_lock key serializing appends
+GENESIS_HASH = "0" * 64
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+# ----------------------------------------------------------------------------
+# Hashing
+# ----------------------------------------------------------------------------
+
+def entry_hash(previous_hash: str, seq: int, entity_type: str, entity_id: str, action: str,
+               timestamp: str, metadata: Dict[str, Any]) -> str:
+    """Chain hash of one entry: SHA-256 over the previous hash and the entry's canonical JSON"""
+    canonical = json.dumps({
+        "previous_hash": previous_hash,
+        "seq": seq,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "action": action,
+        "timestamp": timestamp,
+        "metadata": metadata
+    }, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def leaf_node(hex_hash: str) -> bytes:
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(hex_hash)).digest()
+
+
+def merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """
+    Every level of the tree, leaves first
+    A node without a sibling is promoted unchanged rather than paired with itself,
+    so two different leaf lists can never share a root.
+    """
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [
+            hashlib.sha256(NODE_PREFIX + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[Dict[str, str]]:
+    """Sibling hashes from leaf `index` up to the root"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append({"side": "left" if sibling < index else "right", "hash": level[sibling].hex()})
+        index //= 2
+    return proof
+
+
+def verify_proof(node: bytes, proof: List[Dict[str, str]], root: str) -> bool:
+    """Fold a proof from `node` and compare with the expected root (hex)"""
+    for step in proof:
+        sibling = bytes.fromhex(step["hash"])
+        pair = sibling + node if step["side"] == "left" else node + sibling
+        node = hashlib.sha256(NODE_PREFIX + pair).digest()
+    return node.hex() == root
+
+
+def verify_inclusion(entry: Dict[str, Any], proof: Dict[str, Any]) -> bool:
+    """
+    Check an entry against a proof document from LedgerStore.proof:
+    its chain hash, its path to the block root and the block's path to the ledger root
+    """
+    expected = entry_hash(
+        entry["previous_hash"], entry["seq"], entry["entity_type"], entry["entity_id"],
+        entry["action"], entry["timestamp"], entry["metadata"]
+    )
+    if expected != entry["current_hash"]:
+        return False
+    block = proof["block"]
+    return (
+        verify_proof(leaf_node(expected), proof["entry_path"], block["merkle_root"])
+        and verify_proof(bytes.fromhex(block["merkle_root"]), proof["block_path"], proof["ledger_root"])
+    )
+
+
+# ----------------------------------------------------------------------------
+# Store
+# ----------------------------------------------------------------------------
+
+def normalize_entity_id(entity_id: str) -> str:
+    """crypto_ledger.entity_id is a UUID; raises ValueError otherwise"""
+    return str(uuid.UUID(entity_id))
+
+
+class LedgerStore:
+    """Appends to crypto_ledger, seals blocks into ledger_blocks and builds inclusion proofs"""
+
+    def __init__(self, db_pool, block_size: int = LEDGER_BLOCK_SIZE):
+        self.db_pool = db_pool
+        self.block_size = block_size
+        self.block_roots: List[bytes] = []  # Sealed blocks never change, so their roots are cached
+        self.block_levels: List[List[bytes]] = [[]]  # ...and so is the tree over them, until a block is added
+
+        # Counters
+        self.appended = 0
+        self.sealed_blocks = 0
+        self.proofs = 0
+
+    async def append(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Chain and insert (entity_type, entity_id, action, metadata, signed_by) entries in one
+        transaction, sealing every block they complete. Returns seq and hash per entry.
+        """
+        async with self.db_pool.acquire() as conn:
+            # Hash metadata as JSONB will hand it back to proofs, not as sent: values such
+            # as 1e+20 don't survive JSONB unchanged (it returns 100000000000000000000)
+            stored = await conn.fetch(
+                """
+                SELECT raw::jsonb::text AS metadata
+                FROM unnest($1::text[]) WITH ORDINALITY AS m(raw, ord) ORDER BY ord
+                """,
+                [json.dumps(entry.get("metadata") or {}) for entry in entries]
+            )
+
+            async with conn.transaction():
+                await conn.execute("SELECT pg_advisory_xact_lock($1)", LEDGER_LOCK_KEY)
+                head = await conn.fetchrow(
+                    "SELECT seq, current_hash FROM crypto_ledger WHERE seq IS NOT NULL ORDER BY seq DESC LIMIT 1"
+                )
+                seq, previous_hash = (head["seq"], head["current_hash"]) if head else (0, GENESIS_HASH)
+
+                records, appended = [], []
+                for entry, metadata_json in zip(entries, (row["metadata"] for row in stored)):
+                    seq += 1
+                    timestamp = datetime.utcnow()
+                    metadata = json.loads(metadata_json)
+                    current_hash = entry_hash(
+                        previous_hash, seq, entry["entity_type"], entry["entity_id"], entry["action"],
+                        timestamp.isoformat(), metadata
+                    )
+                    records.append((
+                        seq, entry["entity_type"], entry["entity_id"], entry["action"], previous_hash,
+                        current_hash, timestamp, entry.get("signed_by"), metadata_json
+                    ))
+                    appended.append({"seq": seq, "previous_hash": previous_hash, "current_hash": current_hash})
+                    previous_hash = current_hash
+
+                await conn.executemany(
+                    """
+                    INSERT INTO crypto_ledger
+                        (seq, entity_type, entity_id, action, previous_hash, current_hash, timestamp, signed_by, metadata)
+                    VALUES ($1, $2, $3::uuid, $4, $5, $6, $7, $8::uuid, $9::jsonb)
+                    """,
+                    records
+                )
+                await self._seal(conn, seq)
+
+        self.appended += len(entries)
+        return appended
+
+    async def _seal(self, conn, head_seq: int):
+        """Seal every full block up to `head_seq`, each with one UPDATE"""
+        sealed = await conn.fetchrow("SELECT COALESCE(MAX(last_seq), 0) AS last_seq, COUNT(*) AS blocks FROM ledger_blocks")
+        last_sealed, block_number = sealed["last_seq"], sealed["blocks"]
+        if head_seq - last_sealed < self.block_size:
+            return
+
+        rows = await conn.fetch(
+            "SELECT current_hash FROM crypto_ledger WHERE seq > $1 AND seq <= $2 ORDER BY seq",
+            last_sealed, head_seq - (head_seq - last_sealed) % self.block_size
+        )
+        for start in range(0, len(rows) - self.block_size + 1, self.block_size):
+            block = rows[start:start + self.block_size]
+            root = merkle_levels([leaf_node(row["current_hash"]) for row in block])[-1][0].hex()
+            first_seq = last_sealed + start + 1
+            last_seq = first_seq + self.block_size - 1
+            await conn.execute(
+                """
+                INSERT INTO ledger_blocks (block_number, first_seq, last_seq, merkle_root, last_hash)
+                VALUES ($1, $2, $3, $4, $5)
+                """,
+                block_number, first_seq, last_seq, root, block[-1]["current_hash"]
+            )
+            await conn.execute(
+                "UPDATE crypto_ledger SET block_number = $1, merkle_root = $2 WHERE seq BETWEEN $3 AND $4",
+                block_number, root, first_seq, last_seq
+            )
+            block_number += 1
+            self.sealed_blocks += 1
+
+    async def _block_levels(self, conn) -> List[List[bytes]]:
+        """Merkle levels over every sealed block root, reading only blocks sealed since the last call"""
+        rows = await conn.fetch(
+            "SELECT block_number, merkle_root FROM ledger_blocks WHERE block_number >= $1 ORDER BY block_number",
+            len(self.block_roots)
+        )
+        # A concurrent proof may have cached some of these meanwhile; take only the next ones in order
+        for row in rows:
+            if row["block_number"] == len(self.block_roots):
+                self.block_roots.append(bytes.fromhex(row["merkle_root"]))
+        if len(self.block_levels[0]) != len(self.block_roots):
+            self.block_levels = merkle_levels(list(self.block_roots))
+        return self.block_levels
+
+    async def proof(self, entity_type: str, entity_id: str, seq: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Inclusion proof for the entity's latest entry (or entry `seq`); None when there is none
+        Entries appended since the last sealed block come back with "sealed": false.
+        """
+        async with self.db_pool.acquire() as conn:
+            query = """
+                SELECT seq, entity_type, entity_id::text AS entity_id, action, previous_hash, current_hash,
+                       timestamp, metadata::text AS metadata, block_number
+                FROM crypto_ledger WHERE entity_type = $1 AND entity_id = $2::uuid
+            """
+            if seq is None:
+                row = await conn.fetchrow(query + " AND seq IS NOT NULL ORDER BY seq DESC LIMIT 1",
+                                          entity_type, entity_id)
+            else:
+                row = await conn.fetchrow(query + " AND seq = $3", entity_type, entity_id, seq)
+            if row is None:
+                return None
+
+            entry = {
+                "seq": row["seq"],
+                "entity_type": row["entity_type"],
+                "entity_id": row["entity_id"],
+                "action": row["action"],
+                "timestamp": row["timestamp"].isoformat(),
+                "metadata": json.loads(row["metadata"]),
+                "previous_hash": row["previous_hash"],
+                "current_hash": row["current_hash"]
+            }
+            if row["block_number"] is None:
+                return {"entry": entry, "sealed": False}
+
+            block = await conn.fetchrow("SELECT * FROM ledger_blocks WHERE block_number = $1", row["block_number"])
+            leaves = await conn.fetch(
+                "SELECT current_hash FROM crypto_ledger WHERE seq BETWEEN $1 AND $2 ORDER BY seq",
+                block["first_seq"], block["last_seq"]
+            )
+            block_levels = await self._block_levels(conn)
+
+        entry_levels = merkle_levels([leaf_node(leaf["current_hash"]) for leaf in leaves])
+        self.proofs += 1
+        return {
+            "entry": entry,
+            "sealed": True,
+            "block": {
+                "block_number": block["block_number"],
+                "first_seq": block["first_seq"],
+                "last_seq": block["last_seq"],
+                "merkle_root": block["merkle_root"],
+                "sealed_at": block["sealed_at"].isoformat()
+            },
+            "entry_path": merkle_proof(entry_levels, entry["seq"] - block["first_seq"]),
+            "block_path": merkle_proof(block_levels, block["block_number"]),
+            "ledger_root": block_levels[-1][0].hex(),
+            "blocks": len(block_levels[0])
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "appended": self.appended,
+            "sealed_blocks": self.sealed_blocks,
+            "proofs": self.proofs,
+            "cached_block_roots": len(self.block_roots)
+        }
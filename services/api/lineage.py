@@ -0,0 +1,227 @@
+"""
+Antimony Labs - Contribution lineage
+contribution_closure holds every (ancestor, descendant) pair of the contribution
+graph with its shortest distance, once over all edges ("*") and once per
+relationship type, so ancestors, descendants and shortest paths are indexed
+lookups rather than recursive walks. It is kept up to date as edges are added and
+can be rebuilt from contribution_relationships at any time.
+"""
+
+import asyncio
+import uuid
+from collections import defaultdict, deque
+from typing import Dict, Any, List, Optional
+
+ANY_RELATIONSHIP = "*"
+LINEAGE_MAX_RESULTS = 10000
+LINEAGE_REBUILD_ATTEMPTS = 3  # Snapshots tried before a rebuild computes while holding the lock
+
+
+class LineageCycle(ValueError):
+    """The edge would make a contribution its own ancestor"""
+
+
+def normalize_contribution_id(contribution_id: str) -> str:
+    """Contribution ids are UUIDs; raises ValueError otherwise"""
+    return str(uuid.UUID(contribution_id))
+
+
+# Every ancestor of the parent (and the parent itself) now reaches every descendant of
+# the child (and the child itself) one hop further than the two distances combined
+EXTEND_CLOSURE = """
+    INSERT INTO contribution_closure (ancestor_id, descendant_id, relationship_type, depth)
+    SELECT up.ancestor_id, down.descendant_id, $3, up.depth + down.depth + 1
+    FROM (
+        SELECT $1::uuid AS ancestor_id, 0 AS depth
+        UNION ALL
+        SELECT ancestor_id, depth FROM contribution_closure WHERE descendant_id = $1 AND relationship_type = $3
+    ) up
+    CROSS JOIN (
+        SELECT $2::uuid AS descendant_id, 0 AS depth
+        UNION ALL
+        SELECT descendant_id, depth FROM contribution_closure WHERE ancestor_id = $2 AND relationship_type = $3
+    ) down
+    ON CONFLICT (ancestor_id, descendant_id, relationship_type)
+    DO UPDATE SET depth = LEAST(contribution_closure.depth, EXCLUDED.depth)
+"""
+
+
+EDGES_QUERY = """
+    SELECT parent_contribution_id AS parent, child_contribution_id AS child, relationship_type
+    FROM contribution_relationships
+    WHERE parent_contribution_id IS NOT NULL AND child_contribution_id IS NOT NULL
+    ORDER BY id
+"""
+
+
+def closure_records(edges: List[tuple]) -> List[tuple]:
+    """
+    (ancestor, descendant, scope, depth) rows for (parent, child, relationship_type) edges
+    Breadth-first from every node, per scope: shortest distances without enumerating paths.
+    """
+    adjacency = defaultdict(lambda: defaultdict(set))
+    for parent, child, relationship_type in edges:
+        adjacency[ANY_RELATIONSHIP][parent].add(child)
+        if relationship_type:
+            adjacency[relationship_type][parent].add(child)
+
+    records = []
+    for scope, graph in adjacency.items():
+        for start in list(graph):
+            seen = {start: 0}
+            queue = deque([start])
+            while queue:
+                node = queue.popleft()
+                for child in graph.get(node, ()):
+                    if child not in seen:
+                        seen[child] = seen[node] + 1
+                        queue.append(child)
+            records.extend((start, node, scope, depth) for node, depth in seen.items() if node != start)
+    return records
+
+
+class LineageIndex:
+    """Reads and maintains the contribution closure table"""
+
+    def __init__(self, db_pool):
+        self.db_pool = db_pool
+
+    async def add_relationship(self, parent_id: str, child_id: str, relationship_type: str) -> str:
+        """
+        Record parent → child and extend the closure in the same transaction
+        Raises LineageCycle if the child already reaches the parent.
+        """
+        if relationship_type == ANY_RELATIONSHIP:
+            raise ValueError(f"'{ANY_RELATIONSHIP}' is reserved for lineage over every relationship type")
+        if parent_id == child_id:
+            raise LineageCycle("A contribution cannot build on itself")
+        async with self.db_pool.acquire() as conn:
+            async with conn.transaction():
+                # Serialize writers so two concurrent edges can't close a cycle between them
+                await conn.execute("LOCK TABLE contribution_closure IN SHARE ROW EXCLUSIVE MODE")
+                if await conn.fetchval(
+                    """
+                    SELECT 1 FROM contribution_closure
+                    WHERE ancestor_id = $1 AND descendant_id = $2 AND relationship_type = $3
+                    """,
+                    child_id, parent_id, ANY_RELATIONSHIP
+                ):
+                    raise LineageCycle("Child is already an ancestor of the parent")
+
+                relationship_id = await conn.fetchval(
+                    """
+                    INSERT INTO contribution_relationships (parent_contribution_id, child_contribution_id, relationship_type)
+                    VALUES ($1::uuid, $2::uuid, $3) RETURNING id::text
+                    """,
+                    parent_id, child_id, relationship_type
+                )
+                for scope in (ANY_RELATIONSHIP, relationship_type):
+                    await conn.execute(EXTEND_CLOSURE, parent_id, child_id, scope)
+        return relationship_id
+
+    async def _related(self, column: str, other: str, contribution_id: str, relationship_type: str,
+                       max_depth: Optional[int], limit: int) -> List[Dict[str, Any]]:
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT {other}::text AS contribution_id, depth FROM contribution_closure
+                WHERE {column} = $1::uuid AND relationship_type = $2 AND depth <= $3
+                ORDER BY depth, {other} LIMIT $4
+                """,
+                contribution_id, relationship_type, max_depth or 2**31 - 1, limit
+            )
+        return [dict(row) for row in rows]
+
+    async def ancestors(self, contribution_id: str, relationship_type: str = ANY_RELATIONSHIP,
+                        max_depth: Optional[int] = None, limit: int = LINEAGE_MAX_RESULTS) -> List[Dict[str, Any]]:
+        """Everything the contribution builds on, nearest first"""
+        return await self._related("descendant_id", "ancestor_id", contribution_id, relationship_type,
+                                   max_depth, limit)
+
+    async def descendants(self, contribution_id: str, relationship_type: str = ANY_RELATIONSHIP,
+                          max_depth: Optional[int] = None, limit: int = LINEAGE_MAX_RESULTS) -> List[Dict[str, Any]]:
+        """Everything built on the contribution, nearest first"""
+        return await self._related("ancestor_id", "descendant_id", contribution_id, relationship_type,
+                                   max_depth, limit)
+
+    async def shortest_path(self, ancestor_id: str, descendant_id: str,
+                            relationship_type: str = ANY_RELATIONSHIP) -> Optional[List[str]]:
+        """
+        One shortest ancestor → descendant path, or None if there is none
+        Only nodes on some shortest path are read: those x with d(a, x) + d(x, d) = d(a, d).
+        """
+        if ancestor_id == descendant_id:
+            return [ancestor_id]
+        async with self.db_pool.acquire() as conn:
+            distance = await conn.fetchval(
+                """
+                SELECT depth FROM contribution_closure
+                WHERE ancestor_id = $1::uuid AND descendant_id = $2::uuid AND relationship_type = $3
+                """,
+                ancestor_id, descendant_id, relationship_type
+            )
+            if distance is None:
+                return None
+
+            rows = await conn.fetch(
+                """
+                SELECT x.descendant_id::text AS node, x.depth FROM contribution_closure x
+                JOIN contribution_closure y
+                  ON y.ancestor_id = x.descendant_id AND y.descendant_id = $2::uuid AND y.relationship_type = $3
+                WHERE x.ancestor_id = $1::uuid AND x.relationship_type = $3 AND x.depth + y.depth = $4
+                """,
+                ancestor_id, descendant_id, relationship_type, distance
+            )
+            levels = defaultdict(set)
+            for row in rows:
+                levels[row["depth"]].add(row["node"])
+            levels[0], levels[distance] = {ancestor_id}, {descendant_id}
+
+            nodes = [node for level in levels.values() for node in level]
+            edges = await conn.fetch(
+                """
+                SELECT parent_contribution_id::text AS parent, child_contribution_id::text AS child
+                FROM contribution_relationships
+                WHERE parent_contribution_id = ANY($1::uuid[]) AND child_contribution_id = ANY($1::uuid[])
+                  AND ($2 = '*' OR relationship_type = $2)
+                """,
+                nodes, relationship_type
+            )
+
+        children = defaultdict(set)
+        for edge in edges:
+            children[edge["parent"]].add(edge["child"])
+        path = [ancestor_id]
+        for depth in range(1, distance + 1):
+            # Every node at this depth still reaches the descendant in the remaining hops
+            path.append(min(children[path[-1]] & levels[depth]))
+        return path
+
+    async def rebuild(self) -> int:
+        """
+        Recompute the closure from contribution_relationships (after edges are deleted); returns rows
+        The closure is computed in a thread from an unlocked snapshot of the edges; the
+        table lock covers only checking that snapshot is still current and the rewrite.
+        """
+        for attempt in range(LINEAGE_REBUILD_ATTEMPTS):
+            async with self.db_pool.acquire() as conn:
+                edges = [tuple(edge) for edge in await conn.fetch(EDGES_QUERY)]
+            records = await asyncio.to_thread(closure_records, edges)
+
+            async with self.db_pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute("LOCK TABLE contribution_closure IN SHARE ROW EXCLUSIVE MODE")
+                    current = [tuple(edge) for edge in await conn.fetch(EDGES_QUERY)]
+                    if current != edges:
+                        if attempt < LINEAGE_REBUILD_ATTEMPTS - 1:
+                            # Edges changed meanwhile; take a fresh snapshot
+                            continue
+                        # They keep changing: compute from this one while holding the lock
+                        records = await asyncio.to_thread(closure_records, current)
+
+                    await conn.execute("TRUNCATE contribution_closure")
+                    await conn.copy_records_to_table(
+                        "contribution_closure", records=records,
+                        columns=["ancestor_id", "descendant_id", "relationship_type", "depth"]
+                    )
+            return len(records)
@@ -0,0 +1,248 @@
+"""
+Antimony Labs - User notifications
+Fan-out is one bulk INSERT; unread badges are Redis counters kept in step with
+inserts and mark-read, so a dashboard render never runs COUNT(*). New
+notifications are published per user for /ws/notifications/{user_id}.
+
+A missing counter is recounted from PostgreSQL. Every write announces itself in a
+per-user sync hash before touching PostgreSQL and again after (bumping an epoch),
+and a recount is cached only if no write was in flight or finished meanwhile, so a
+counter is never seeded with a count that misses an increment.
+"""
+
+import os
+from typing import Dict, Any, List, Optional
+
+import codec
+
+UNREAD_PREFIX = "notifications:unread:"
+SYNC_SUFFIX = ":sync"
+NOTIFICATION_CHANNEL_PREFIX = "notifications:"
+# Counters expire so any drift from Redis restarts or races heals on the next recount
+UNREAD_TTL_SECONDS = int(os.getenv("NOTIFICATION_UNREAD_TTL_SECONDS", "86400"))
+NOTIFICATION_FANOUT_MAX = int(os.getenv("NOTIFICATION_FANOUT_MAX", "10000"))
+NOTIFICATION_PAGE_MAX = 200
+# A writer that crashed mid-write blocks caching that user's recount for at most this long
+SYNC_TTL_SECONDS = 300
+
+# Before a write: one more writer in flight per user, and a new epoch
+BEGIN_WRITE_SCRIPT = """
+for _, sync in ipairs(KEYS) do
+    redis.call('HINCRBY', sync, 'writers', 1)
+    redis.call('HINCRBY', sync, 'epoch', 1)
+    redis.call('EXPIRE', sync, ARGV[1])
+end
+return 1
+"""
+
+# After a write (KEYS: counter, sync pairs): apply the delta to counters that exist
+# ("reset" drops the counter), end the write and start a new epoch. Missing counters
+# are recounted on the next read, which already includes the change.
+END_WRITE_SCRIPT = """
+local counts = {}
+for i = 1, #KEYS, 2 do
+    local key, sync, delta = KEYS[i], KEYS[i + 1], ARGV[(i + 1) / 2]
+    local count = -1
+    if delta == 'reset' then
+        redis.call('DEL', key)
+    elseif redis.call('EXISTS', key) == 1 then
+        count = redis.call('INCRBY', key, delta)
+        if count < 0 then
+            redis.call('SET', key, 0, 'KEEPTTL')
+            count = 0
+        end
+    end
+    counts[#counts + 1] = count
+    if redis.call('HINCRBY', sync, 'writers', -1) < 0 then
+        redis.call('HSET', sync, 'writers', 0)
+    end
+    redis.call('HINCRBY', sync, 'epoch', 1)
+    redis.call('EXPIRE', sync, ARGV[#ARGV])
+end
+return counts
+"""
+
+# Cache a recount only if no write overlapped it: none in flight, epoch unchanged
+SEED_UNREAD_SCRIPT = """
+local writers = tonumber(redis.call('HGET', KEYS[2], 'writers') or '0')
+local epoch = redis.call('HGET', KEYS[2], 'epoch') or '0'
+if writers > 0 or epoch ~= ARGV[2] then
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3], 'NX')
+return 1
+"""
+
+FAN_OUT_QUERY = """
+    INSERT INTO notifications (user_id, task_id, title, message, notification_type)
+    SELECT recipient, $2::uuid, $3, $4, $5 FROM unnest($1::uuid[]) AS recipient
+    RETURNING id::text AS id, user_id::text AS user_id, created_at
+"""
+
+
+def unread_key(user_id: str) -> str:
+    return f"{UNREAD_PREFIX}{user_id}"
+
+
+def sync_key(user_id: str) -> str:
+    return f"{UNREAD_PREFIX}{user_id}{SYNC_SUFFIX}"
+
+
+def notification_channel(user_id: str) -> str:
+    return f"{NOTIFICATION_CHANNEL_PREFIX}{user_id}"
+
+
+class NotificationService:
+    """Bulk notification writes, cached unread counts and per-user push"""
+
+    def __init__(self, redis_client, db_pool):
+        self.redis_client = redis_client
+        self.db_pool = db_pool
+        self.begin_script = redis_client.register_script(BEGIN_WRITE_SCRIPT)
+        self.end_script = redis_client.register_script(END_WRITE_SCRIPT)
+        self.seed_script = redis_client.register_script(SEED_UNREAD_SCRIPT)
+
+        # Counters
+        self.sent = 0
+        self.fan_outs = 0
+        self.count_hits = 0
+        self.recounts = 0
+        self.uncached_recounts = 0
+
+    async def fan_out(self, user_ids: List[str], title: str, message: str, notification_type: str,
+                      task_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Notify every user in one INSERT, then bump counters and push in one pipeline"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return []
+        await self._begin_write(user_ids)
+        rows = []
+        try:
+            async with self.db_pool.acquire() as conn:
+                rows = await conn.fetch(FAN_OUT_QUERY, user_ids, task_id, title, message, notification_type)
+        except BaseException:
+            await self._end_write(user_ids, [0] * len(user_ids))
+            raise
+
+        notifications = [{
+            "id": row["id"],
+            "user_id": row["user_id"],
+            "task_id": task_id,
+            "title": title,
+            "message": message,
+            "notification_type": notification_type,
+            "is_read": False,
+            "created_at": row["created_at"].isoformat()
+        } for row in rows]
+
+        inserted = {notification["user_id"] for notification in notifications}
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            await self._end_write(user_ids, [1 if user_id in inserted else 0 for user_id in user_ids], client=pipe)
+            for notification in notifications:
+                pipe.publish(
+                    notification_channel(notification["user_id"]),
+                    codec.dumps({"type": "notification", "notification": notification})
+                )
+            await pipe.execute()
+
+        self.fan_outs += 1
+        self.sent += len(notifications)
+        return notifications
+
+    async def _begin_write(self, user_ids: List[str]):
+        await self.begin_script(keys=[sync_key(user_id) for user_id in user_ids], args=[SYNC_TTL_SECONDS])
+
+    async def _end_write(self, user_ids: List[str], deltas: List[Any], client=None) -> List[int]:
+        """Apply per-user deltas (or "reset") and close the write; -1 where no counter is cached"""
+        keys = [key for user_id in user_ids for key in (unread_key(user_id), sync_key(user_id))]
+        return await self.end_script(keys=keys, args=[*deltas, SYNC_TTL_SECONDS], client=client)
+
+    async def unread_count(self, user_id: str) -> int:
+        """Cached badge count; recounted (index-only) when the counter is missing"""
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.get(unread_key(user_id))
+            pipe.hget(sync_key(user_id), "epoch")
+            cached, epoch = await pipe.execute()
+        if cached is not None:
+            self.count_hits += 1
+            return int(cached)
+
+        async with self.db_pool.acquire() as conn:
+            count = await conn.fetchval(
+                "SELECT COUNT(*) FROM notifications WHERE user_id = $1::uuid AND is_read = false", user_id
+            )
+        self.recounts += 1
+        # A write that overlapped the count may not be in it; serve it but don't cache it
+        if not await self.seed_script(
+            keys=[unread_key(user_id), sync_key(user_id)], args=[count, epoch or "0", UNREAD_TTL_SECONDS]
+        ):
+            self.uncached_recounts += 1
+        return count
+
+    async def mark_read(self, user_id: str, notification_ids: Optional[List[str]] = None) -> Dict[str, int]:
+        """Mark some (or all) of a user's notifications read; only rows that flip count"""
+        await self._begin_write([user_id])
+        marked = 0
+        try:
+            marked = await self._mark_read(user_id, notification_ids)
+        finally:
+            # Marking everything read drops the counter: notifications inserted meanwhile
+            # are counted by the recount instead of being wiped by a reset to 0
+            delta = "reset" if notification_ids is None else -marked
+            unread = (await self._end_write([user_id], [delta]))[0]
+        if unread < 0:
+            unread = await self.unread_count(user_id)
+
+        # Other open tabs update their badge
+        await self.redis_client.publish(
+            notification_channel(user_id), codec.dumps({"type": "unread", "count": unread})
+        )
+        return {"marked": marked, "unread": unread}
+
+    async def _mark_read(self, user_id: str, notification_ids: Optional[List[str]]) -> int:
+        async with self.db_pool.acquire() as conn:
+            if notification_ids is None:
+                marked = await conn.fetchval(
+                    """
+                    WITH flipped AS (
+                        UPDATE notifications SET is_read = true
+                        WHERE user_id = $1::uuid AND is_read = false RETURNING 1
+                    ) SELECT COUNT(*) FROM flipped
+                    """,
+                    user_id
+                )
+            else:
+                marked = await conn.fetchval(
+                    """
+                    WITH flipped AS (
+                        UPDATE notifications SET is_read = true
+                        WHERE user_id = $1::uuid AND id = ANY($2::uuid[]) AND is_read = false RETURNING 1
+                    ) SELECT COUNT(*) FROM flipped
+                    """,
+                    user_id, notification_ids
+                )
+        return marked
+
+    async def recent(self, user_id: str, limit: int, unread_only: bool = False) -> List[Dict[str, Any]]:
+        """Newest notifications first"""
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT id::text AS id, task_id::text AS task_id, title, message, notification_type,
+                       is_read, created_at
+                FROM notifications
+                WHERE user_id = $1::uuid AND (NOT $2 OR is_read = false)
+                ORDER BY created_at DESC LIMIT $3
+                """,
+                user_id, unread_only, limit
+            )
+        return [{**dict(row), "created_at": row["created_at"].isoformat()} for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sent": self.sent,
+            "fan_outs": self.fan_outs,
+            "count_hits": self.count_hits,
+            "recounts": self.recounts,
+            "uncached_recounts": self.uncached_recounts
+        }
@@ -0,0 +1,179 @@
+"""
+Antimony Labs - LLM presence registry
+One sorted set scored by last-seen time, plus an optional metadata hash per instance
+"""
+
+import asyncio
+import json
+import os
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+PRESENCE_REGISTRY = "presence:registry"
+PRESENCE_META_PREFIX = "presence:meta:"
+PRESENCE_TTL_SECONDS = int(os.getenv("PRESENCE_TTL_SECONDS", "60"))
+PRESENCE_FLUSH_MS = int(os.getenv("PRESENCE_FLUSH_MS", "1000"))
+
+# Prune everything older than the cutoff, then return name, last-seen and metadata
+# for every live member in one round trip
+LIVE_INSTANCES_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1])
+local members = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+local result = {}
+for i = 1, #members, 2 do
+    table.insert(result, members[i])
+    table.insert(result, members[i + 1])
+    table.insert(result, redis.call('HGETALL', ARGV[2] .. members[i]))
+end
+return result
+"""
+
+# Drop an instance only if nothing newer than ARGV[1] was recorded for it meanwhile
+# (e.g. by its new socket on another API worker)
+REMOVE_IF_STALE_SCRIPT = """
+local seen_at = redis.call('ZSCORE', KEYS[1], ARGV[2])
+if seen_at and tonumber(seen_at) > tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[2])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+
+def meta_key(name: str) -> str:
+    return f"{PRESENCE_META_PREFIX}{name}"
+
+
+class PresenceRegistry:
+    """
+    Tracks which LLM instances are alive without knowing their names in advance
+    Heartbeats are coalesced in memory and written for all instances in one
+    pipeline every `flush_ms`, however often each instance reports.
+    """
+
+    def __init__(self, redis_client, ttl_seconds: int = PRESENCE_TTL_SECONDS,
+                 flush_ms: int = PRESENCE_FLUSH_MS):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.flush_ms = flush_ms
+        self.live_script = redis_client.register_script(LIVE_INSTANCES_SCRIPT)
+        self.remove_script = redis_client.register_script(REMOVE_IF_STALE_SCRIPT)
+        self.pending: Dict[str, tuple] = {}
+        self.connections: Dict[str, int] = {}  # Open sockets per instance on this worker
+        self.last_noted: Dict[str, float] = {}  # ...and when this worker last heard from it
+        self.task = None
+
+        # Counters
+        self.heartbeats = 0
+        self.flushes = 0
+        self.written = 0
+
+    def start(self):
+        self.task = asyncio.create_task(self._run())
+
+    def note(self, name: str, meta: Optional[Dict[str, Any]] = None):
+        """Record activity from an instance; written on the next flush"""
+        self.heartbeats += 1
+        seen_at = time.time()
+        _, pending_meta = self.pending.get(name, (None, None))
+        if meta:
+            pending_meta = {**(pending_meta or {}), **meta}
+        self.pending[name] = (seen_at, pending_meta)
+        if name in self.connections:
+            self.last_noted[name] = seen_at
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_ms / 1000)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Presence flush failed: {e}")
+
+    async def flush(self):
+        """Write every coalesced heartbeat in one pipeline"""
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for name, (seen_at, meta) in pending.items():
+                    self.queue_touch(pipe, name, seen_at, meta)
+                await pipe.execute()
+        except Exception:
+            # Keep anything newer that arrived meanwhile, retry the rest next flush
+            for name, entry in pending.items():
+                self.pending.setdefault(name, entry)
+            raise
+        self.flushes += 1
+        self.written += len(pending)
+
+    def connect(self, name: str):
+        """A socket for the instance opened on this worker"""
+        self.connections[name] = self.connections.get(name, 0) + 1
+        self.note(name)
+
+    async def disconnect(self, name: str) -> bool:
+        """
+        A socket for the instance closed; when it was this worker's last one, mark the
+        instance offline unless it has been seen since (it reconnected elsewhere).
+        Returns whether the instance was removed.
+        """
+        self.connections[name] -= 1
+        if self.connections[name] > 0:
+            return False
+        del self.connections[name]
+        last_noted = self.last_noted.pop(name, time.time())
+        self.pending.pop(name, None)
+        return bool(await self.remove_script(keys=[PRESENCE_REGISTRY, meta_key(name)], args=[last_noted, name]))
+
+    def queue_touch(self, pipe, name: str, seen_at: float, meta: Optional[Dict[str, Any]] = None):
+        """Add one heartbeat's writes to a pipeline; metadata values are stored JSON-encoded"""
+        pipe.zadd(PRESENCE_REGISTRY, {name: seen_at})
+        if meta:
+            pipe.hset(meta_key(name), mapping={field: json.dumps(value) for field, value in meta.items()})
+            pipe.expire(meta_key(name), self.ttl_seconds)
+
+    async def live(self) -> Dict[str, Dict[str, Any]]:
+        """Every instance seen within the TTL, with its metadata; stale members are pruned"""
+        cutoff = time.time() - self.ttl_seconds
+        flat = await self.live_script(keys=[PRESENCE_REGISTRY], args=[cutoff, PRESENCE_META_PREFIX])
+
+        instances = {}
+        for i in range(0, len(flat), 3):
+            name, seen_at, fields = flat[i], float(flat[i + 1]), flat[i + 2]
+            meta = {}
+            for field, value in zip(fields[::2], fields[1::2]):
+                try:
+                    meta[field] = json.loads(value)
+                except ValueError:
+                    meta[field] = value
+            instances[name] = {
+                "last_seen": datetime.utcfromtimestamp(seen_at).isoformat(),
+                **meta
+            }
+        return instances
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self.pending),
+            "heartbeats": self.heartbeats,
+            "flushes": self.flushes,
+            "written": self.written
+        }
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"⚠️  Final presence flush failed: {e}")
@@ -0,0 +1,143 @@
+"""
+Antimony Labs - Load-aware routing for `auto` LLM targets
+Picks a live instance of the right kind from presence load reports, keeps a
+session on the same instance, and logs every decision to a Redis stream
+"""
+
+import json
+import os
+import random
+from typing import Dict, Any, List, Optional, Tuple
+
+ROUTING_STRATEGY = os.getenv("LLM_ROUTING_STRATEGY", "p2c")  # p2c (power of two choices) or least_loaded
+ROUTE_STICKY_TTL_SECONDS = int(os.getenv("LLM_ROUTE_STICKY_TTL_SECONDS", "3600"))
+ROUTING_LOG_STREAM = "routing:decisions"
+ROUTING_LOG_MAXLEN = int(os.getenv("LLM_ROUTING_LOG_MAXLEN", "100000"))
+
+AUTO_TARGET = "auto"
+LLM_KINDS = ("claude", "codex")
+
+# Which kind handles a task when the target is plain "auto"
+TASK_KINDS = {
+    "process_new_idea": "claude",
+    "generate_code_structure": "codex"
+}
+
+
+class NoLiveInstance(LookupError):
+    """No live instance can take an `auto` message"""
+
+
+def is_auto(to_llm: str) -> bool:
+    return to_llm == AUTO_TARGET or to_llm.startswith(f"{AUTO_TARGET}:")
+
+
+def auto_kind(to_llm: str, task: str) -> Optional[str]:
+    """Kind requested by "auto:<kind>", else the task's usual kind (None means any)"""
+    if to_llm.startswith(f"{AUTO_TARGET}:"):
+        return to_llm.split(":", 1)[1]
+    return TASK_KINDS.get(task)
+
+
+def instance_kind(name: str, meta: Dict[str, Any]) -> Optional[str]:
+    if meta.get("kind") in LLM_KINDS:
+        return meta["kind"]
+    return next((kind for kind in LLM_KINDS if name.startswith(kind)), None)
+
+
+def task_cost(meta: Dict[str, Any]) -> float:
+    """Score added by one more task: per worker, scaled down by the host's reported capacity"""
+    workers = max(int((meta.get("load") or {}).get("workers") or 1), 1)
+    capacity = max(float(meta.get("capacity") or 1.0), 0.1)
+    return 1 / (workers * capacity)
+
+
+def load_score(meta: Dict[str, Any]) -> float:
+    """
+    Queued + running tasks, counting the one being routed, weighted by task_cost,
+    plus per-core CPU load; lower is better. Counting the routed task breaks ties
+    between idle instances in favour of the bigger host.
+    """
+    load = meta.get("load") or {}
+    backlog = (load.get("queue_depth") or 0) + (load.get("in_flight") or 0)
+    return (backlog + 1) * task_cost(meta) + float(load.get("cpu") or 0.0)
+
+
+def route_key(session_id: str) -> str:
+    return f"route:session:{session_id}"
+
+
+class TaskRouter:
+    """Resolves `auto` / `auto:<kind>` targets to concrete instance names"""
+
+    def __init__(self, redis_client, presence_registry, strategy: str = ROUTING_STRATEGY):
+        self.redis_client = redis_client
+        self.presence_registry = presence_registry
+        self.strategy = strategy
+
+    def _choose(self, candidates: Dict[str, float]) -> str:
+        if self.strategy == "least_loaded" or len(candidates) <= 2:
+            return min(candidates, key=candidates.get)
+        first, second = random.sample(list(candidates), 2)
+        return first if candidates[first] <= candidates[second] else second
+
+    async def resolve(self, requests: List[Tuple[str, str, Optional[str]]]) -> List[str]:
+        """
+        Map each (to_llm, task, session_id) to the instance it should go to
+        Named targets pass through untouched. One presence read, one MGET of
+        sticky routes and one pipeline of writes cover the whole list.
+        Raises NoLiveInstance when an auto target has no live candidate.
+        """
+        targets = [to_llm for to_llm, _, _ in requests]
+        auto = [i for i, to_llm in enumerate(targets) if is_auto(to_llm)]
+        if not auto:
+            return targets
+
+        live = await self.presence_registry.live()
+        scores = {name: load_score(meta) for name, meta in live.items()}
+
+        sessions = list(dict.fromkeys(requests[i][2] for i in auto if requests[i][2]))
+        sticky = {}
+        if sessions:
+            sticky = dict(zip(sessions, await self.redis_client.mget([route_key(s) for s in sessions])))
+
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for i in auto:
+                to_llm, task, session_id = requests[i]
+                kind = auto_kind(to_llm, task)
+                candidates = {
+                    name: scores[name] for name, meta in live.items()
+                    if kind is None or instance_kind(name, meta) == kind
+                }
+                if not candidates:
+                    raise NoLiveInstance(f"No live {kind or 'LLM'} instance for '{task}'")
+
+                previous = sticky.get(session_id)
+                if previous in candidates:
+                    target, reason = previous, "sticky"
+                else:
+                    target, reason = self._choose(candidates), self.strategy
+
+                # Count the new task against the target so a batch spreads out
+                scores[target] += task_cost(live[target])
+
+                if session_id:
+                    sticky[session_id] = target
+                    pipe.set(route_key(session_id), target, ex=ROUTE_STICKY_TTL_SECONDS)
+                pipe.xadd(
+                    ROUTING_LOG_STREAM,
+                    {
+                        "session_id": session_id or "",
+                        "task": task,
+                        "requested": to_llm,
+                        "target": target,
+                        "reason": reason,
+                        "candidates": json.dumps({name: round(score, 3) for name, score in candidates.items()})
+                    },
+                    maxlen=ROUTING_LOG_MAXLEN,
+                    approximate=True
+                )
+                targets[i] = target
+            await pipe.execute()
+
+        return targets
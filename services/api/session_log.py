@@ -0,0 +1,169 @@
+"""
+Antimony Labs - LLM session conversation log
+Turns are rows in llm_session_turns keyed by (session_id, seq) instead of a
+growing JSONB document, so an append writes only the new turns. Old turns can be
+folded into a snapshot on llm_sessions to keep the live log short.
+"""
+
+import os
+from typing import Dict, Any, List, Optional, Tuple
+
+import codec
+
+SESSION_PAGE_DEFAULT = 50
+SESSION_PAGE_MAX = 500
+SESSION_APPEND_MAX = 1000
+SESSION_KEEP_RECENT = int(os.getenv("SESSION_KEEP_RECENT_TURNS", "50"))  # Turns left live after compaction
+
+# Claims the sequence numbers (creating the session on first use) and inserts the turns
+# in one statement; the cost doesn't depend on how many turns came before
+APPEND_QUERY = """
+    WITH session AS (
+        INSERT INTO llm_sessions (session_key, turn_count) VALUES ($1, $2)
+        ON CONFLICT (session_key) DO UPDATE
+            SET turn_count = llm_sessions.turn_count + EXCLUDED.turn_count, updated_at = NOW()
+        RETURNING id, turn_count
+    )
+    INSERT INTO llm_session_turns (session_id, seq, role, llm_name, content)
+    SELECT session.id, session.turn_count - $2 + turn.ord, turn.role, turn.llm_name, turn.content::jsonb
+    FROM session, unnest($3::text[], $4::text[], $5::text[]) WITH ORDINALITY AS turn(role, llm_name, content, ord)
+    RETURNING seq
+"""
+
+# Pages are built as JSON in PostgreSQL and spliced into the response untouched
+TAIL_QUERY = """
+    SELECT seq, json_build_object(
+        'seq', seq, 'role', role, 'llm_name', llm_name, 'content', content, 'created_at', created_at
+    )::text AS turn
+    FROM llm_session_turns
+    WHERE session_id = $1 AND seq < $2
+    ORDER BY seq DESC LIMIT $3
+"""
+
+
+class SessionLog:
+    """Append, page and compact the turns of LLM sessions"""
+
+    def __init__(self, db_pool):
+        self.db_pool = db_pool
+
+        # Counters
+        self.appended = 0
+        self.compactions = 0
+        self.compacted_turns = 0
+
+    async def append(self, session_key: str, turns: List[Dict[str, Any]]) -> List[int]:
+        """Append turns ({role, llm_name, content}) in order; returns their sequence numbers"""
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                APPEND_QUERY, session_key, len(turns),
+                [turn["role"] for turn in turns],
+                [turn.get("llm_name") for turn in turns],
+                [codec.dumps(turn.get("content")) for turn in turns]
+            )
+        self.appended += len(rows)
+        return sorted(row["seq"] for row in rows)
+
+    async def tail(self, session_key: str, limit: int,
+                   before_seq: Optional[int] = None) -> Optional[Tuple[Dict[str, Any], List[str], Optional[int]]]:
+        """
+        Newest `limit` turns before `before_seq`, oldest first, as encoded JSON
+        Returns (session summary, turns, next before_seq) or None for an unknown session;
+        the summary carries the compaction snapshot once paging reaches it.
+        """
+        async with self.db_pool.acquire() as conn:
+            session = await conn.fetchrow(
+                """
+                SELECT id, turn_count, compacted_through, snapshot::text AS snapshot
+                FROM llm_sessions WHERE session_key = $1
+                """,
+                session_key
+            )
+            if session is None:
+                return None
+            rows = await conn.fetch(
+                TAIL_QUERY, session["id"], before_seq or session["turn_count"] + 1, limit
+            )
+
+        turns = [row["turn"] for row in reversed(rows)]
+        oldest = rows[-1]["seq"] if rows else (before_seq or session["turn_count"] + 1)
+        next_before = oldest if oldest - 1 > session["compacted_through"] else None
+        summary = {
+            "session_key": session_key,
+            "turn_count": session["turn_count"],
+            "compacted_through": session["compacted_through"],
+            "next_before_seq": next_before
+        }
+        if next_before is None and session["snapshot"]:
+            summary["snapshot"] = codec.loads(session["snapshot"])
+        return summary, turns, next_before
+
+    async def compact(self, session_key: str, keep_recent: int = SESSION_KEEP_RECENT,
+                      summary: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Fold every turn except the newest `keep_recent` into the session snapshot and delete them
+        `summary` (e.g. written by an LLM) replaces the snapshot's summary text; the
+        snapshot always keeps cumulative turn counts per role and the time span.
+        Returns the new snapshot, or None for an unknown session.
+        """
+        async with self.db_pool.acquire() as conn:
+            async with conn.transaction():
+                # Row lock: appends to this session wait, other sessions are untouched
+                session = await conn.fetchrow(
+                    """
+                    SELECT id, turn_count, compacted_through, snapshot::text AS snapshot
+                    FROM llm_sessions WHERE session_key = $1 FOR UPDATE
+                    """,
+                    session_key
+                )
+                if session is None:
+                    return None
+                snapshot = codec.loads(session["snapshot"]) if session["snapshot"] else {
+                    "through_seq": 0, "turns": 0, "roles": {}, "summary": None, "first_at": None
+                }
+                through = session["turn_count"] - keep_recent
+                if through <= session["compacted_through"]:
+                    return snapshot
+
+                folded = await conn.fetch(
+                    """
+                    WITH folded AS (
+                        DELETE FROM llm_session_turns
+                        WHERE session_id = $1 AND seq > $2 AND seq <= $3
+                        RETURNING role, created_at
+                    )
+                    SELECT role, COUNT(*) AS turns, MIN(created_at) AS first_at, MAX(created_at) AS last_at
+                    FROM folded GROUP BY role
+                    """,
+                    session["id"], session["compacted_through"], through
+                )
+
+                for row in folded:
+                    role = row["role"] or "unknown"
+                    snapshot["roles"][role] = snapshot["roles"].get(role, 0) + row["turns"]
+                    snapshot["turns"] += row["turns"]
+                if folded:
+                    snapshot["first_at"] = snapshot["first_at"] or min(row["first_at"] for row in folded).isoformat()
+                    snapshot["last_at"] = max(row["last_at"] for row in folded).isoformat()
+                snapshot["through_seq"] = through
+                if summary is not None:
+                    snapshot["summary"] = summary
+
+                await conn.execute(
+                    """
+                    UPDATE llm_sessions SET compacted_through = $2, snapshot = $3::jsonb, updated_at = NOW()
+                    WHERE id = $1
+                    """,
+                    session["id"], through, codec.dumps(snapshot)
+                )
+
+        self.compactions += 1
+        self.compacted_turns += sum(row["turns"] for row in folded)
+        return snapshot
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "appended": self.appended,
+            "compactions": self.compactions,
+            "compacted_turns": self.compacted_turns
+        }
@@ -0,0 +1,178 @@
+"""
+Antimony Labs - Durable LLM task delivery on Redis Streams
+Producer side: every LLM channel maps to one stream per priority lane.
+Pub/sub deliveries are sequenced and kept in a short per-channel replay
+buffer so reconnecting sockets can catch up on what they missed.
+"""
+
+import os
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import codec
+
+# Delivery mode for inter-LLM messages: "pubsub", "streams" or "both"
+DELIVERY_MODE = os.getenv("LLM_DELIVERY_MODE", "both")
+
+# Approximate cap per stream so unconsumed lanes stay bounded
+STREAM_MAXLEN = int(os.getenv("LLM_STREAM_MAXLEN", "10000"))
+
+# Lanes in drain order: consumers always empty "high" before "normal" before "low"
+LANES = ("high", "normal", "low")
+
+# Pub/sub replay: a global sequence number and the last REPLAY_MAXLEN messages per channel
+SEQUENCE_KEY = "llm:seq"
+SEQ_PREFIX = '{"_seq":'
+REPLAY_MAXLEN = int(os.getenv("LLM_REPLAY_MAXLEN", "1000"))
+
+# Number the message, splice "_seq" into its JSON object, keep a copy under
+# stream ID <seq>-0 and publish it, atomically so sequence order is publish order
+SEQUENCED_PUBLISH_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local payload = ARGV[2]
+if payload == '{}' then
+    payload = '{"_seq":' .. seq .. '}'
+elseif string.sub(payload, 1, 1) == '{' then
+    payload = '{"_seq":' .. seq .. ',' .. string.sub(payload, 2)
+end
+redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[3], seq .. '-0', 'data', payload)
+redis.call('PUBLISH', ARGV[1], payload)
+return seq
+"""
+
+
+def lane_for_priority(priority: int) -> str:
+    """Map LLMMessage.priority onto a delivery lane"""
+    if priority >= 2:
+        return "high"
+    if priority <= 0:
+        return "low"
+    return "normal"
+
+
+def stream_key(channel: str, lane: str) -> str:
+    """Stream holding one lane of a channel, e.g. stream:llm:claude-hpc:high"""
+    return f"stream:{channel}:{lane}"
+
+
+_publish_script = None
+
+
+def sequenced_publish_script(redis_client):
+    """The publish script, registered once and run through whichever pipeline needs it"""
+    global _publish_script
+    if _publish_script is None:
+        _publish_script = redis_client.register_script(SEQUENCED_PUBLISH_SCRIPT)
+    return _publish_script
+
+
+def replay_key(channel: str) -> str:
+    """Retention buffer of sequenced pub/sub messages, e.g. replay:llm:claude-hpc"""
+    return f"replay:{channel}"
+
+
+def message_seq(data: Union[str, bytes]) -> Optional[int]:
+    """Sequence number of a delivered message; JSON is read from the spliced prefix without decoding"""
+    if isinstance(data, str):
+        if not data.startswith(SEQ_PREFIX):
+            return None
+        end = data.find(",", len(SEQ_PREFIX))
+        return int(data[len(SEQ_PREFIX):end if end != -1 else data.find("}")])
+    try:
+        message = codec.decode(data)
+    except ValueError:
+        return None
+    return message.get("_seq") if isinstance(message, dict) else None
+
+
+def lane_streams(channel: str) -> List[str]:
+    """All lane streams for a channel, highest priority first"""
+    return [stream_key(channel, lane) for lane in LANES]
+
+
+def uses_pubsub() -> bool:
+    return DELIVERY_MODE in ("pubsub", "both")
+
+
+def uses_streams() -> bool:
+    return DELIVERY_MODE in ("streams", "both")
+
+
+async def _queue_delivery(pipe, publish_script, channel: str, payload: str, lane: str):
+    """Add the sequenced publish and/or stream append for one message to a pipeline"""
+    if uses_pubsub():
+        # Queued on the pipeline, which loads the script on execute if Redis lacks it
+        await publish_script(
+            keys=[SEQUENCE_KEY, replay_key(channel)],
+            args=[channel, payload, REPLAY_MAXLEN],
+            client=pipe
+        )
+    if uses_streams():
+        pipe.xadd(
+            stream_key(channel, lane),
+            {"data": payload},
+            maxlen=STREAM_MAXLEN,
+            approximate=True
+        )
+
+
+def _delivery_info(lane: str, seq: Optional[int], stream_id: Optional[str]) -> Dict[str, Any]:
+    delivery = {"mode": DELIVERY_MODE, "lane": lane}
+    if seq is not None:
+        delivery["seq"] = seq
+    if stream_id is not None:
+        delivery["stream_id"] = stream_id
+    return delivery
+
+
+async def deliver(redis_client, channel: str, payload: str, priority: int = 1) -> Dict[str, Any]:
+    """
+    Deliver an encoded message on a channel according to DELIVERY_MODE
+    Pub/sub and stream writes share one pipelined round trip
+    """
+    return (await deliver_many(redis_client, [(channel, payload, priority)]))[0]
+
+
+async def deliver_many(redis_client, messages: List[Tuple[str, str, int]]) -> List[Dict[str, Any]]:
+    """Deliver many (channel, payload, priority) messages in a single pipelined round trip"""
+    lanes = [lane_for_priority(priority) for _, _, priority in messages]
+    publish_script = sequenced_publish_script(redis_client)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for (channel, payload, _), lane in zip(messages, lanes):
+            await _queue_delivery(pipe, publish_script, channel, payload, lane)
+        results = await pipe.execute()
+
+    # Each message queued one command per enabled transport: the sequence number, then the stream ID
+    per_message = int(uses_pubsub()) + int(uses_streams())
+    return [
+        _delivery_info(
+            lane,
+            results[i * per_message] if uses_pubsub() else None,
+            results[i * per_message + per_message - 1] if uses_streams() else None
+        )
+        for i, lane in enumerate(lanes)
+    ]
+
+
+async def read_replay(redis_client, channels: List[str], since_seq: int) -> Tuple[List[Tuple[int, str]], bool]:
+    """
+    Sequenced (seq, payload) messages after `since_seq` on the given channels, oldest first
+    Also reports whether a buffer may already have trimmed messages from the gap: it is
+    at capacity and even its oldest retained message is newer than since_seq + 1.
+    (Sequence numbers are global, so gaps between one channel's messages are normal.)
+    """
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for channel in channels:
+            pipe.xrange(replay_key(channel), min=f"{since_seq + 1}-0")
+            pipe.xrange(replay_key(channel), count=1)
+            pipe.xlen(replay_key(channel))
+        results = await pipe.execute()
+
+    messages = []
+    truncated = False
+    for entries, oldest, length in zip(results[::3], results[1::3], results[2::3]):
+        messages.extend((int(entry_id.split("-")[0]), fields["data"]) for entry_id, fields in entries)
+        if oldest and length >= REPLAY_MAXLEN and int(oldest[0][0].split("-")[0]) > since_seq + 1:
+            truncated = True
+    messages.sort()
+    return messages, truncated
@@ -0,0 +1,196 @@
+"""
+Antimony Labs - Console task queue
+Workers claim pending tasks in priority order with FOR UPDATE SKIP LOCKED, so any
+number of them drain the queue without blocking each other. A claim is a lease:
+it is renewed by heartbeats, and tasks whose lease runs out go back to pending.
+An empty queue is waited on through LISTEN/NOTIFY instead of polling.
+"""
+
+import asyncio
+import os
+from typing import Dict, Any, List, Optional
+
+TASK_LEASE_SECONDS = int(os.getenv("TASK_LEASE_SECONDS", "300"))
+TASK_MAX_ATTEMPTS = int(os.getenv("TASK_MAX_ATTEMPTS", "5"))  # Claims before an abandoned task is failed
+TASK_RECLAIM_INTERVAL_SECONDS = float(os.getenv("TASK_RECLAIM_INTERVAL_SECONDS", "30"))
+TASK_CLAIM_MAX = 100
+TASK_CLAIM_WAIT_MAX_SECONDS = 30
+TASK_NOTIFY_CHANNEL = "tasks_pending"
+# Waiters re-check this often anyway, in case the LISTEN connection dropped a notification
+TASK_WAKEUP_FALLBACK_SECONDS = 5.0
+
+FINISHED_STATUSES = ("completed", "failed", "review")
+
+CLAIM_QUERY = """
+    WITH next AS (
+        SELECT id FROM tasks
+        WHERE status = 'pending' AND ($3::text[] IS NULL OR task_type = ANY($3::text[]))
+        ORDER BY priority_rank, created_at
+        LIMIT $2
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE tasks t SET
+        status = 'in_progress',
+        assigned_llm = $1,
+        started_at = COALESCE(t.started_at, NOW()),
+        lease_expires_at = NOW() + make_interval(secs => $4),
+        attempts = COALESCE(t.attempts, 0) + 1
+    FROM next WHERE t.id = next.id
+    RETURNING t.id::text AS id, t.project_id::text AS project_id, t.title, t.description, t.task_type,
+              t.priority, t.priority_rank, t.created_at, t.attempts, t.lease_expires_at,
+              t.llm_session_id::text AS llm_session_id, t.metadata::text AS metadata
+"""
+
+# Expired leases go back to pending (or fail after too many attempts); locked rows are
+# skipped so several API workers can run this at once
+RECLAIM_QUERY = """
+    UPDATE tasks t SET
+        status = CASE WHEN t.attempts >= $1 THEN 'failed' ELSE 'pending' END,
+        assigned_llm = NULL,
+        lease_expires_at = NULL
+    FROM (
+        SELECT id FROM tasks
+        WHERE status = 'in_progress' AND lease_expires_at < NOW()
+        LIMIT 1000
+        FOR UPDATE SKIP LOCKED
+    ) expired
+    WHERE t.id = expired.id
+    RETURNING t.status
+"""
+
+
+class TaskQueue:
+    """Claims, lease renewal, completion and reclaim over the console `tasks` table"""
+
+    def __init__(self, db_pool, lease_seconds: int = TASK_LEASE_SECONDS):
+        self.db_pool = db_pool
+        self.lease_seconds = lease_seconds
+        self.listen_conn = None
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+        # Counters
+        self.claimed = 0
+        self.empty_claims = 0
+        self.reclaimed = 0
+        self.abandoned = 0
+        self.notifications = 0
+
+    async def start(self):
+        """Hold one pooled connection for LISTEN and start the reclaim loop"""
+        self.listen_conn = await self.db_pool.acquire()
+        await self.listen_conn.add_listener(TASK_NOTIFY_CHANNEL, self._notified)
+        self.task = asyncio.create_task(self._reclaim_loop())
+
+    def _notified(self, connection, pid, channel, payload):
+        self.notifications += 1
+        # Wake every current waiter; later waiters wait on the fresh event
+        self.wakeup.set()
+        self.wakeup = asyncio.Event()
+
+    async def claim(self, llm_name: str, limit: int = 1, task_types: Optional[List[str]] = None,
+                    wait_seconds: float = 0) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` pending tasks to `llm_name`, highest priority and oldest first
+        With `wait_seconds`, an empty queue is waited on until a task is queued or time runs out.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait_seconds
+        while True:
+            # Take the event before querying so a notification in between isn't missed
+            wakeup = self.wakeup
+            async with self.db_pool.acquire() as conn:
+                rows = await conn.fetch(CLAIM_QUERY, llm_name, limit, task_types, self.lease_seconds)
+            if rows:
+                self.claimed += len(rows)
+                rows = sorted(rows, key=lambda row: (row["priority_rank"], row["created_at"]))
+                return [dict(row) for row in rows]
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.empty_claims += 1
+                return []
+            try:
+                await asyncio.wait_for(wakeup.wait(), min(remaining, TASK_WAKEUP_FALLBACK_SECONDS))
+            except asyncio.TimeoutError:
+                pass
+
+    async def heartbeat(self, task_id: str, llm_name: str) -> Optional[str]:
+        """Extend a lease; None when the task is no longer leased to `llm_name`"""
+        async with self.db_pool.acquire() as conn:
+            lease = await conn.fetchval(
+                """
+                UPDATE tasks SET lease_expires_at = NOW() + make_interval(secs => $3)
+                WHERE id = $1::uuid AND assigned_llm = $2 AND status = 'in_progress'
+                RETURNING lease_expires_at
+                """,
+                task_id, llm_name, self.lease_seconds
+            )
+        return lease.isoformat() if lease else None
+
+    async def complete(self, task_id: str, llm_name: str, status: str, commit_hash: Optional[str] = None,
+                       pr_url: Optional[str] = None, metadata: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Finish a leased task; None when the lease was lost (the task may be someone else's now)
+        Returns the task title and the users to notify (its creator and the project owner).
+        """
+        async with self.db_pool.acquire() as conn:
+            finished = await conn.fetchrow(
+                """
+                UPDATE tasks t SET
+                    status = $3,
+                    completed_at = NOW(),
+                    lease_expires_at = NULL,
+                    commit_hash = COALESCE($4, commit_hash),
+                    pr_url = COALESCE($5, pr_url),
+                    metadata = COALESCE(metadata, '{}'::jsonb) || COALESCE($6::jsonb, '{}'::jsonb)
+                WHERE t.id = $1::uuid AND t.assigned_llm = $2 AND t.status = 'in_progress'
+                RETURNING t.title, array_remove(ARRAY[
+                    t.user_id::text, (SELECT p.user_id::text FROM projects p WHERE p.id = t.project_id)
+                ], NULL) AS recipients
+                """,
+                task_id, llm_name, status, commit_hash, pr_url, metadata
+            )
+        return dict(finished) if finished else None
+
+    async def reclaim(self) -> int:
+        """Release every expired lease once; returns how many tasks were released"""
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch(RECLAIM_QUERY, TASK_MAX_ATTEMPTS)
+        failed = sum(1 for row in rows if row["status"] == "failed")
+        self.reclaimed += len(rows) - failed
+        self.abandoned += failed
+        return len(rows)
+
+    async def _reclaim_loop(self):
+        while True:
+            await asyncio.sleep(TASK_RECLAIM_INTERVAL_SECONDS)
+            try:
+                released = await self.reclaim()
+                if released:
+                    print(f"♻️  Released {released} expired task leases")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Task lease reclaim failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "claimed": self.claimed,
+            "empty_claims": self.empty_claims,
+            "reclaimed": self.reclaimed,
+            "abandoned": self.abandoned,
+            "notifications": self.notifications
+        }
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+        if self.listen_conn is not None:
+            await self.listen_conn.remove_listener(TASK_NOTIFY_CHANNEL, self._notified)
+            await self.db_pool.release(self.listen_conn)
+            self.listen_conn = None
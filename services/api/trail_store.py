@@ -0,0 +1,328 @@
+"""
+Antimony Labs - Paper-trail storage
+Redis is the hot cache; PostgreSQL is the durable store, fed by a write-behind stage
+"""
+
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+import codec
+
+TRAIL_TTL_SECONDS = 86400  # 24 hour cache
+# Newest entries kept per cached trail when PostgreSQL holds the full history
+HOT_WINDOW = int(os.getenv("PAPER_TRAIL_HOT_WINDOW", "1000"))
+
+# Write-behind outbox: every event is appended here in the same transaction as the cache write
+OUTBOX_STREAM = "trail:outbox"
+OUTBOX_GROUP = "pg-writer"
+OUTBOX_MAXLEN = int(os.getenv("PAPER_TRAIL_OUTBOX_MAXLEN", "1000000"))
+
+FLUSH_SIZE = int(os.getenv("PAPER_TRAIL_FLUSH_SIZE", "500"))
+FLUSH_INTERVAL_MS = int(os.getenv("PAPER_TRAIL_FLUSH_INTERVAL_MS", "1000"))
+FLUSH_RETRY_MAX_SECONDS = float(os.getenv("PAPER_TRAIL_FLUSH_RETRY_MAX_SECONDS", "30"))
+OUTBOX_CLAIM_IDLE_MS = int(os.getenv("PAPER_TRAIL_OUTBOX_CLAIM_IDLE_MS", "60000"))
+
+PG_CURSOR_PREFIX = "pg:"
+# Redis cursors are "<remaining>@<timestamp>": the entries left in the list and the
+# timestamp (µs since the epoch) of the last entry returned
+ANCHOR_SEPARATOR = "@"
+EPOCH = datetime(1970, 1, 1)
+
+
+def trail_key(entity_type: str, entity_id: str) -> str:
+    return f"trail:{entity_type}:{entity_id}"
+
+
+def encode_entry(action: str, data: Dict[str, Any], timestamp: Optional[datetime] = None) -> str:
+    """Encoded trail entry as stored in Redis"""
+    return codec.dumps({
+        "action": action,
+        "data": data,
+        "timestamp": (timestamp or datetime.utcnow()).isoformat()
+    })
+
+
+def entry_micros(entry: str) -> int:
+    """Timestamp of an encoded entry in µs since the epoch"""
+    return (datetime.fromisoformat(codec.loads(entry)["timestamp"]) - EPOCH) // timedelta(microseconds=1)
+
+
+def parse_redis_cursor(cursor: str) -> Tuple[int, int]:
+    remaining, anchor = cursor.split(ANCHOR_SEPARATOR)
+    return int(remaining), int(anchor)
+
+
+def validate_cursor(cursor: Optional[str]):
+    """Raise ValueError unless `cursor` is a Redis ("<n>@<µs>") or PostgreSQL ("pg:<id>") cursor"""
+    if cursor is None:
+        return
+    if cursor.startswith(PG_CURSOR_PREFIX):
+        positions = [cursor[len(PG_CURSOR_PREFIX):]]
+    else:
+        positions = cursor.split(ANCHOR_SEPARATOR)
+        if len(positions) != 2:
+            raise ValueError("Invalid cursor")
+    if not all(position.isdigit() for position in positions) or int(positions[0]) == 0:
+        raise ValueError("Invalid cursor")
+
+
+class TrailStore:
+    """Reads and writes paper-trail events across the Redis cache and PostgreSQL"""
+
+    def __init__(self, redis_client, db_pool=None):
+        self.redis_client = redis_client
+        self.db_pool = db_pool
+
+    async def append(self, events: List[Tuple[str, str, str]]) -> List[str]:
+        """
+        Append (entity_type, entity_id, encoded entry) events in one MULTI transaction
+        Events are grouped per trail key; each one is also queued for write-behind,
+        and each list is trimmed to the newest HOT_WINDOW entries (older ones are read
+        from PostgreSQL). Returns the trail key of every event.
+        """
+        keys = [trail_key(entity_type, entity_id) for entity_type, entity_id, _ in events]
+        grouped: Dict[str, List[str]] = {}
+        for key, (_, _, entry) in zip(keys, events):
+            grouped.setdefault(key, []).append(entry)
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            for key, entries in grouped.items():
+                pipe.lpush(key, *entries)
+                if self.db_pool is not None:
+                    pipe.ltrim(key, 0, HOT_WINDOW - 1)
+                pipe.expire(key, TRAIL_TTL_SECONDS)
+            if self.db_pool is not None:
+                for entity_type, entity_id, entry in events:
+                    pipe.xadd(
+                        OUTBOX_STREAM,
+                        {"entity_type": entity_type, "entity_id": entity_id, "entry": entry},
+                        maxlen=OUTBOX_MAXLEN,
+                        approximate=True
+                    )
+            await pipe.execute()
+
+        return keys
+
+    async def read_page(self, entity_type: str, entity_id: str, limit: int,
+                        cursor: Optional[str] = None) -> Tuple[List[str], Optional[str], Optional[int]]:
+        """
+        Read up to `limit` encoded entries, newest first
+        Redis cursors count entries remaining from the tail of the list, so they stay
+        valid while newer entries are pushed onto the head. The cache may hold only the
+        newest part of a trail (it expired and restarted, or was trimmed to the hot
+        window), so once the list runs out, or no longer matches the cursor, the read
+        continues in PostgreSQL from the cursor's timestamp and returns "pg:<id>" cursors.
+        Returns (entries, next_cursor, total); total is None once PostgreSQL is involved.
+        Raises ValueError for a malformed cursor.
+        """
+        validate_cursor(cursor)
+        if cursor is not None and cursor.startswith(PG_CURSOR_PREFIX):
+            before_id = int(cursor[len(PG_CURSOR_PREFIX):])
+            return await self._read_pg_page(entity_type, entity_id, limit, before_id=before_id)
+
+        remaining, anchor = parse_redis_cursor(cursor) if cursor is not None else (None, None)
+
+        key = trail_key(entity_type, entity_id)
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.llen(key)
+            if remaining is None:
+                pipe.lrange(key, 0, limit - 1)
+            else:
+                # The entry just before the cursor must still be the one it was issued after
+                pipe.lindex(key, -remaining - 1)
+                pipe.lrange(key, -remaining, min(-remaining + limit - 1, -1))
+            if remaining is None:
+                total, entries = await pipe.execute()
+            else:
+                total, previous, entries = await pipe.execute()
+
+        if self.db_pool is not None:
+            if remaining is None and total == 0:
+                return await self._read_pg_page(entity_type, entity_id, limit)
+            if remaining is not None and (previous is None or entry_micros(previous) != anchor):
+                # The list expired or restarted since the cursor was issued
+                return await self._read_pg_page(entity_type, entity_id, limit, before_time=anchor)
+
+        left = (total if remaining is None else remaining) - len(entries)
+        if left > 0:
+            return entries, f"{left}{ANCHOR_SEPARATOR}{entry_micros(entries[-1])}", total
+        if self.db_pool is None or not entries:
+            return entries, None, total
+
+        # The cached list is used up; anything older lives only in PostgreSQL
+        older, next_cursor, _ = await self._read_pg_page(
+            entity_type, entity_id, limit - len(entries), before_time=entry_micros(entries[-1])
+        )
+        if older or next_cursor:
+            return entries + older, next_cursor, None
+        return entries, None, total
+
+    async def _read_pg_page(self, entity_type: str, entity_id: str, limit: int,
+                            before_id: Optional[int] = None, before_time: Optional[int] = None):
+        """
+        Newest-first page from PostgreSQL
+        `before_id` continues a PostgreSQL cursor; `before_time` (µs since the epoch)
+        continues past the oldest entry read from Redis.
+        """
+        if before_time is not None:
+            query = """
+                SELECT id, action, data::text AS data, created_at FROM paper_trail_events
+                WHERE entity_type = $1 AND entity_id = $2 AND created_at < $4
+                ORDER BY id DESC LIMIT $3
+            """
+            args = (entity_type, entity_id, limit + 1, EPOCH + timedelta(microseconds=before_time))
+        elif before_id is not None:
+            query = """
+                SELECT id, action, data::text AS data, created_at FROM paper_trail_events
+                WHERE entity_type = $1 AND entity_id = $2 AND id < $4
+                ORDER BY id DESC LIMIT $3
+            """
+            args = (entity_type, entity_id, limit + 1, before_id)
+        else:
+            query = """
+                SELECT id, action, data::text AS data, created_at FROM paper_trail_events
+                WHERE entity_type = $1 AND entity_id = $2
+                ORDER BY id DESC LIMIT $3
+            """
+            args = (entity_type, entity_id, limit + 1)
+
+        async with self.db_pool.acquire() as conn:
+            rows = await conn.fetch(query, *args)
+
+        page = rows[:limit]
+        entries = [encode_entry(row["action"], codec.loads(row["data"]), row["created_at"]) for row in page]
+        next_cursor = None
+        if len(rows) > limit:
+            # With an empty page the cursor has to include the first row it skipped
+            next_cursor = f"{PG_CURSOR_PREFIX}{page[-1]['id'] if page else rows[0]['id'] + 1}"
+        return entries, next_cursor, None
+
+
+class TrailWriter:
+    """
+    Write-behind stage draining the outbox stream into PostgreSQL in micro-batches
+    Entries are acked only after their batch commits, so failed flushes are retried
+    and entries left by a crashed worker are reclaimed by another one.
+    """
+
+    def __init__(self, redis_client, db_pool, flush_size: int = FLUSH_SIZE,
+                 flush_interval_ms: int = FLUSH_INTERVAL_MS):
+        self.redis_client = redis_client
+        self.db_pool = db_pool
+        self.flush_size = flush_size
+        self.flush_interval_ms = flush_interval_ms
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self.task = None
+
+        # Counters
+        self.flushed_events = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_size = 0
+
+    async def start(self):
+        try:
+            await self.redis_client.xgroup_create(OUTBOX_STREAM, OUTBOX_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        retry_delay = 1.0
+        batch = []
+        while True:
+            try:
+                if not batch:
+                    batch = await self._collect_batch()
+                if not batch:
+                    continue
+
+                await self._flush(batch)
+                batch = []
+                retry_delay = 1.0
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep the batch and retry with backoff; nothing is acked until it commits
+                self.failed_flushes += 1
+                print(f"⚠️  Paper-trail flush failed, retrying in {retry_delay:.0f}s: {e}")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, FLUSH_RETRY_MAX_SECONDS)
+
+    async def _collect_batch(self):
+        """Gather up to flush_size entries, waiting at most flush_interval_ms"""
+        claimed = await self.redis_client.xautoclaim(
+            OUTBOX_STREAM, OUTBOX_GROUP, self.consumer,
+            min_idle_time=OUTBOX_CLAIM_IDLE_MS, count=self.flush_size
+        )
+        batch = [(entry_id, fields) for entry_id, fields in claimed[1] if fields]
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval_ms / 1000
+        while len(batch) < self.flush_size:
+            remaining_ms = int((deadline - loop.time()) * 1000)
+            if remaining_ms <= 0:
+                break
+            response = await self.redis_client.xreadgroup(
+                OUTBOX_GROUP, self.consumer, {OUTBOX_STREAM: ">"},
+                count=self.flush_size - len(batch), block=remaining_ms
+            )
+            for _, messages in response or []:
+                batch.extend(messages)
+        return batch
+
+    async def _flush(self, batch):
+        """Insert one micro-batch, then ack and delete its outbox entries"""
+        records = []
+        for entry_id, fields in batch:
+            entry = codec.loads(fields["entry"])
+            records.append((
+                entry_id,
+                fields["entity_type"],
+                fields["entity_id"],
+                entry["action"],
+                codec.dumps(entry["data"]),
+                datetime.fromisoformat(entry["timestamp"])
+            ))
+
+        # event_id is the outbox entry ID, so a retried flush never duplicates rows
+        async with self.db_pool.acquire() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO paper_trail_events (event_id, entity_type, entity_id, action, data, created_at)
+                VALUES ($1, $2, $3, $4, $5::jsonb, $6)
+                ON CONFLICT (event_id) DO NOTHING
+                """,
+                records
+            )
+
+        entry_ids = [entry_id for entry_id, _ in batch]
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.xack(OUTBOX_STREAM, OUTBOX_GROUP, *entry_ids)
+            pipe.xdel(OUTBOX_STREAM, *entry_ids)
+            await pipe.execute()
+
+        self.flushes += 1
+        self.flushed_events += len(batch)
+        self.last_flush_size = len(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "flushed_events": self.flushed_events,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_size": self.last_flush_size
+        }
+
+    async def close(self):
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
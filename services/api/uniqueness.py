@@ -0,0 +1,138 @@
+"""
+Antimony Labs - Vector uniqueness scoring for new ideas
+k-NN against the Qdrant ideas collection, with a NumPy brute-force fallback
+over an in-memory matrix when Qdrant is unavailable
+"""
+
+import os
+import uuid
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+from qdrant_client.http import models as qdrant_models
+
+IDEAS_COLLECTION = "ideas"
+UNIQUENESS_NEIGHBOURS = int(os.getenv("UNIQUENESS_NEIGHBOURS", "5"))
+UNIQUENESS_FALLBACK_MAX_IDEAS = int(os.getenv("UNIQUENESS_FALLBACK_MAX_IDEAS", "50000"))
+# Ideas scoring below this are flagged as near-duplicates of an existing one
+UNIQUENESS_DUPLICATE_THRESHOLD = float(os.getenv("UNIQUENESS_DUPLICATE_THRESHOLD", "0.1"))
+
+
+def idea_text(title: str, description: str) -> str:
+    return f"{title}\n{description}"
+
+
+class IdeaMatrix:
+    """Bounded ring buffer of normalized idea vectors for brute-force cosine k-NN"""
+
+    def __init__(self, max_ideas: int = UNIQUENESS_FALLBACK_MAX_IDEAS):
+        self.max_ideas = max_ideas
+        self.vectors = None
+        self.ids: List[str] = []
+        self.titles: List[str] = []
+        self.size = 0
+        self.next_slot = 0
+
+    def add(self, idea_id: str, title: str, vector: List[float]):
+        row = np.asarray(vector, dtype=np.float32)
+        if self.vectors is None:
+            self.vectors = np.empty((min(1024, self.max_ideas), row.shape[0]), dtype=np.float32)
+        elif self.next_slot == len(self.vectors) and len(self.vectors) < self.max_ideas:
+            # Grow by doubling until the cap, then wrap and overwrite the oldest
+            grown = np.empty((min(len(self.vectors) * 2, self.max_ideas), row.shape[0]), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+
+        slot = self.next_slot % len(self.vectors)
+        self.vectors[slot] = row
+        if slot < len(self.ids):
+            self.ids[slot], self.titles[slot] = idea_id, title
+        else:
+            self.ids.append(idea_id)
+            self.titles.append(title)
+        self.size = min(self.size + 1, len(self.vectors))
+        self.next_slot = slot + 1
+
+    def nearest(self, vector: List[float], k: int) -> List[Tuple[str, float, str]]:
+        """Top-k (id, cosine similarity, title); vectors are normalized so a dot product suffices"""
+        if self.size == 0:
+            return []
+        similarities = self.vectors[:self.size] @ np.asarray(vector, dtype=np.float32)
+        k = min(k, self.size)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [(self.ids[i], float(similarities[i]), self.titles[i]) for i in top]
+
+
+class UniquenessScorer:
+    """Scores an idea as 1 - cosine similarity to its nearest existing idea, then indexes it"""
+
+    def __init__(self, embedding_pipeline, qdrant_client, neighbours: int = UNIQUENESS_NEIGHBOURS):
+        self.embedding_pipeline = embedding_pipeline
+        self.qdrant_client = qdrant_client
+        self.neighbours = neighbours
+        self.matrix = IdeaMatrix()
+
+    async def start(self):
+        """Ensure the collection exists and warm the fallback matrix from it"""
+        try:
+            await self.embedding_pipeline.ensure_collection(IDEAS_COLLECTION)
+
+            offset = None
+            while self.matrix.size < self.matrix.max_ideas:
+                points, offset = await self.qdrant_client.scroll(
+                    IDEAS_COLLECTION, limit=1000, offset=offset, with_vectors=True
+                )
+                for point in points:
+                    self.matrix.add(str(point.id), (point.payload or {}).get("title", ""), point.vector)
+                if offset is None:
+                    break
+        except Exception as e:
+            print(f"⚠️  Could not load ideas from Qdrant, in-memory index starts empty: {e}")
+
+    async def score(self, idea_key: str, title: str, description: str) -> Dict[str, Any]:
+        """Uniqueness in [0, 1] plus the nearest neighbours it was measured against"""
+        vector = (await self.embedding_pipeline.embed([idea_text(title, description)]))[0]
+
+        try:
+            await self.embedding_pipeline.ensure_collection(IDEAS_COLLECTION)
+            hits = await self.qdrant_client.search(
+                IDEAS_COLLECTION, query_vector=vector, limit=self.neighbours
+            )
+            nearest = [(str(hit.id), hit.score, (hit.payload or {}).get("title", "")) for hit in hits]
+            source = "qdrant"
+        except Exception as e:
+            print(f"⚠️  Qdrant k-NN failed, using in-memory index: {e}")
+            nearest = self.matrix.nearest(vector, self.neighbours)
+            source = "memory"
+
+        similarity = max((score for _, score, _ in nearest), default=0.0)
+        uniqueness = float(min(1.0, max(0.0, 1.0 - similarity)))
+
+        await self._index(idea_key, title, vector)
+
+        return {
+            "score": round(uniqueness, 4),
+            "near_duplicate": uniqueness < UNIQUENESS_DUPLICATE_THRESHOLD,
+            "source": source,
+            "nearest": [
+                {"id": point, "similarity": round(score, 4), "title": neighbour_title}
+                for point, score, neighbour_title in nearest
+            ]
+        }
+
+    async def _index(self, idea_key: str, title: str, vector: List[float]):
+        """Add the idea to Qdrant (best effort) and to the fallback matrix"""
+        point = str(uuid.uuid5(uuid.NAMESPACE_URL, f"idea:{idea_key}"))
+        self.matrix.add(point, title, vector)
+        try:
+            await self.embedding_pipeline.ensure_collection(IDEAS_COLLECTION)
+            await self.qdrant_client.upsert(
+                IDEAS_COLLECTION,
+                points=[qdrant_models.PointStruct(
+                    id=point, vector=vector, payload={"idea_key": idea_key, "title": title}
+                )],
+                wait=False
+            )
+        except Exception as e:
+            print(f"⚠️  Indexing idea {idea_key} in Qdrant failed: {e}")
@@ -0,0 +1,212 @@
+"""
+Antimony Labs - WebSocket fan-out hub
+One Redis pub/sub subscription per channel per API worker, shared by every socket
+"""
+
+import asyncio
+import os
+from collections import deque
+from typing import Dict, Set, Iterable, Optional, Union
+
+import codec
+
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "1000"))
+WS_OVERFLOW_POLICY = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+OVERFLOW_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class SlowConsumer(Exception):
+    """A socket fell a full queue behind under the "disconnect" policy"""
+
+
+class SendQueue:
+    """
+    Bounded per-socket outbox filled by the hub reader and drained by the socket's writer
+    When full: "drop_oldest" discards the oldest message, "coalesce" replaces the
+    queued message of the same session (dropping the oldest if there is none), and
+    "disconnect" gives up on the socket.
+    """
+
+    def __init__(self, maxsize: int = WS_SEND_QUEUE_SIZE, policy: str = WS_OVERFLOW_POLICY,
+                 codec_name: str = "json"):
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{policy}'")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.codec_name = codec_name  # Wire format of the queued payloads
+        self.items = deque()  # (session_id, data)
+        self.ready = asyncio.Event()
+        self.overflowed = False
+
+        # Counters
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_water = 0
+
+    @staticmethod
+    def _session(data: Union[str, bytes]) -> Optional[str]:
+        try:
+            message = codec.decode(data)
+        except ValueError:
+            return None
+        return message.get("session_id") if isinstance(message, dict) else None
+
+    def put_nowait(self, data: Union[str, bytes]):
+        """Never blocks, so one slow socket cannot stall the shared reader"""
+        if self.overflowed:
+            self.dropped += 1
+            return
+
+        session = self._session(data) if self.policy == "coalesce" else None
+        if len(self.items) >= self.maxsize:
+            if self.policy == "disconnect":
+                self.overflowed = True
+                self.dropped += 1
+                self.ready.set()
+                return
+            if session is not None:
+                for i, (queued_session, _) in enumerate(self.items):
+                    if queued_session == session:
+                        self.items[i] = (session, data)
+                        self.coalesced += 1
+                        return
+            self.items.popleft()
+            self.dropped += 1
+
+        self.items.append((session, data))
+        self.high_water = max(self.high_water, len(self.items))
+        self.ready.set()
+
+    async def get(self) -> Union[str, bytes]:
+        """Next message to send; raises SlowConsumer once the socket has been given up on"""
+        while not self.items:
+            if self.overflowed:
+                raise SlowConsumer()
+            self.ready.clear()
+            await self.ready.wait()
+        if self.overflowed:
+            raise SlowConsumer()
+        return self.items.popleft()[1]
+
+    def qsize(self) -> int:
+        return len(self.items)
+
+
+class PubSubHub:
+    """
+    Holds a single Redis pub/sub connection for this API worker and fans each
+    message out to the local subscribers registered for its channel.
+
+    Redis connection count is independent of how many sockets are connected and
+    every message is decoded once, no matter how many sockets receive it.
+    """
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.pubsub = None
+        self.subscribers: Dict[str, Set[SendQueue]] = {}
+        self.reader_task = None
+        self.lock = asyncio.Lock()
+
+        # Totals carried over from queues that have been unregistered
+        self.closed_dropped = 0
+        self.closed_coalesced = 0
+        self.slow_disconnects = 0
+
+    async def register(self, queue: SendQueue, channels: Iterable[str]):
+        """Register a subscriber queue for the given channels"""
+        async with self.lock:
+            new_channels = []
+            for channel in channels:
+                if channel not in self.subscribers:
+                    self.subscribers[channel] = set()
+                    new_channels.append(channel)
+                self.subscribers[channel].add(queue)
+
+            if new_channels:
+                if self.pubsub is None:
+                    self.pubsub = self.redis_client.pubsub()
+                await self.pubsub.subscribe(*new_channels)
+
+            if self.reader_task is None:
+                self.reader_task = asyncio.create_task(self._reader())
+
+    async def unregister(self, queue: SendQueue, channels: Iterable[str]):
+        """Remove a subscriber queue, dropping Redis subscriptions nobody needs"""
+        async with self.lock:
+            self.closed_dropped += queue.dropped
+            self.closed_coalesced += queue.coalesced
+            self.slow_disconnects += queue.overflowed
+            empty_channels = []
+            for channel in channels:
+                queues = self.subscribers.get(channel)
+                if queues is None:
+                    continue
+                queues.discard(queue)
+                if not queues:
+                    del self.subscribers[channel]
+                    empty_channels.append(channel)
+
+            if empty_channels and self.pubsub is not None:
+                await self.pubsub.unsubscribe(*empty_channels)
+
+    async def _reader(self):
+        """Read the shared subscription and dispatch to local subscribers"""
+        while True:
+            try:
+                message = await self.pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️  Pub/sub hub read failed: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if message is None or message["type"] != "message":
+                continue
+
+            # JSON payloads pass through as-is; MessagePack subscribers share one transcode
+            # (a payload that won't transcode skips only the MessagePack subscribers)
+            data, packed, unpackable = message["data"], None, False
+            for queue in tuple(self.subscribers.get(message["channel"], ())):
+                if queue.codec_name != "msgpack":
+                    queue.put_nowait(data)
+                    continue
+                if unpackable:
+                    continue
+                if packed is None:
+                    try:
+                        packed = codec.json_to_msgpack(data)
+                    except ValueError as e:
+                        print(f"⚠️  Not forwarding non-JSON message to MessagePack sockets: {e}")
+                        unpackable = True
+                        continue
+                queue.put_nowait(packed)
+
+    def stats(self) -> Dict[str, int]:
+        """Channel, subscriber and send-queue counters for this worker"""
+        live_queues = set().union(*self.subscribers.values()) if self.subscribers else set()
+        return {
+            "channels": len(self.subscribers),
+            "subscribers": sum(len(queues) for queues in self.subscribers.values()),
+            "queued": sum(queue.qsize() for queue in live_queues),
+            "max_queue_depth": max((queue.qsize() for queue in live_queues), default=0),
+            "dropped": self.closed_dropped + sum(queue.dropped for queue in live_queues),
+            "coalesced": self.closed_coalesced + sum(queue.coalesced for queue in live_queues),
+            "slow_disconnects": self.slow_disconnects
+        }
+
+    async def close(self):
+        """Stop the reader and release the pub/sub connection"""
+        if self.reader_task:
+            self.reader_task.cancel()
+            try:
+                await self.reader_task
+            except asyncio.CancelledError:
+                pass
+            self.reader_task = None
+        if self.pubsub is not None:
+            await self.pubsub.close()
+            self.pubsub = None